@@ -0,0 +1,383 @@
+"""Benchmarks of game, environment and agent hot paths.
+
+Run all benchmarks, save results as a JSON baseline, and compare a new run
+with a baseline to report regressions:
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json
+"""
+import json
+import numpy as np
+import os
+import random
+import sys
+import tempfile
+import time
+
+from games.bitboard import BitTTT
+from games.game import TIE
+from games.mnk import ConnectFour, MNK4x4k3, MNK5x5k4
+from games.tictactoe import TTT
+from main import play_game
+from qlearning.agent import Agent
+from qlearning.environment import Environment
+from qlearning.experience import Experience
+from qlearning.trajectory import Trajectory
+
+
+SEED = 0
+BENCHMARKS = []
+
+
+def benchmark(func):
+    """Register benchmark function.
+
+    A benchmark function takes a scale of its number of iterations and
+    returns a dictionary of metrics, @see metric.
+    """
+    BENCHMARKS.append(func)
+    return func
+
+
+def metric(value, unit, better="higher"):
+    """Return metric of a benchmark.
+
+    Args:
+        value (float): measured value
+        unit (str): unit of value
+        better (str): "higher" or "lower", which way value is better
+    """
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def seed():
+    random.seed(SEED)
+    np.random.seed(SEED)
+
+
+def best_time(func, repeat=3):
+    """Return best time in seconds of repeat calls of func."""
+    times = []
+    for repeat_i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def rate(func, number, repeat=3):
+    """Return metric of number operations run by func per second."""
+    return metric(number / best_time(func, repeat), "op/s")
+
+
+def latency(func, number, repeat=3):
+    """Return metric of nanoseconds per operation, func running number."""
+    return metric(
+        best_time(func, repeat) / number * 1e9, "ns/op", better="lower"
+    )
+
+
+def game_moves(games_n):
+    """Return list of random move sequences, one per game."""
+    seed()
+    return [random.sample(range(9), 9) for game_n in range(games_n)]
+
+
+# ---- Game
+
+def game_benchmarks(game_cls, scale):
+    moves = game_moves(int(1000 * scale))
+    game = game_cls()
+    game.state()
+
+    def act():
+        for sequence in moves:
+            game.reset()
+            for action_n in sequence:
+                if game.is_over():
+                    break
+                game.act(action_n, game.player_n)
+
+    acts_n = 0
+    for sequence in moves:
+        game.reset()
+        for action_n in sequence:
+            if game.is_over():
+                break
+            game.act(action_n, game.player_n)
+            acts_n += 1
+
+    def state():
+        for repeat_i in range(acts_n):
+            game.state()
+
+    def step():
+        for sequence in moves:
+            game.reset()
+            for action_n in sequence:
+                if game.step(action_n, game.player_n) > TIE:
+                    break
+
+    results = {
+        'act': rate(act, acts_n),
+        'step': rate(step, acts_n),
+        'state': rate(state, acts_n),
+    }
+    if hasattr(game, 'check_end'):
+        results['check_end'] = rate(
+            lambda: [game.check_end() for repeat_i in range(acts_n)], acts_n
+        )
+    return results
+
+
+@benchmark
+def ttt(scale):
+    return game_benchmarks(TTT, scale)
+
+
+@benchmark
+def bit_ttt(scale):
+    return game_benchmarks(BitTTT, scale)
+
+
+# ---- Environment
+
+@benchmark
+def environment(scale):
+    moves = game_moves(int(1000 * scale))
+    env = Environment(TTT)
+    acts_n = sum(len(sequence) for sequence in moves)
+
+    def act():
+        for sequence in moves:
+            env.reset()
+            for action_n in sequence:
+                env.act(action_n, env.game.player_n)
+
+    def step():
+        for sequence in moves:
+            env.reset()
+            for action_n in sequence:
+                env.step(action_n, env.game.player_n)
+
+    resets_n = int(10000 * scale)
+    return {
+        'act': rate(act, acts_n),
+        'step': rate(step, acts_n),
+        'reset': rate(
+            lambda: [env.reset() for reset_i in range(resets_n)], resets_n
+        ),
+    }
+
+
+# ---- Agent
+
+@benchmark
+def agent(scale):
+    seed()
+    number = int(10000 * scale)
+    agent = Agent(TTT)
+    agent.qvalues[:] = np.random.rand(*agent.qvalues.shape)
+    states = np.random.randint(len(TTT.states), size=number).tolist()
+    actions = np.random.randint(9, size=number).tolist()
+    experiences = [
+        Experience(state, action, 1, next_state)
+        for state, action, next_state in zip(
+            states, actions, reversed(states)
+        )
+    ]
+
+    def pick_action():
+        for state in states:
+            agent.pick_action(state)
+
+    def predict():
+        for state in states:
+            agent.predict(state)
+
+    def update_qvalue():
+        for experience in experiences:
+            agent.update_qvalue(experience)
+
+    columns = (
+        np.array(states), np.array(actions), np.ones(number),
+        np.array(states[::-1]), np.zeros(number, dtype=bool),
+    )
+
+    agent.set_params(exploration_rate=0.5)
+    return {
+        'pick_action': latency(pick_action, number),
+        'predict': latency(predict, number),
+        'update_qvalue': latency(update_qvalue, number),
+        'update_batch': latency(lambda: agent.update_batch(*columns), number),
+    }
+
+
+@benchmark
+def agent_io(scale):
+    seed()
+    agent = Agent(TTT)
+    agent.qvalues[:] = np.random.rand(*agent.qvalues.shape)
+    with tempfile.TemporaryDirectory() as directory:
+        save_time = best_time(lambda: agent.save(directory))
+        load_time = best_time(lambda: agent.load(directory))
+        size = sum(
+            os.path.getsize(os.path.join(directory, file_name))
+            for file_name in os.listdir(directory)
+        )
+    return {
+        'save': metric(save_time * 1e3, "ms", better="lower"),
+        'load': metric(load_time * 1e3, "ms", better="lower"),
+        'size': metric(size, "B", better="lower"),
+    }
+
+
+# ---- Training
+
+@benchmark
+def play(scale):
+    seed()
+    games_n = int(200 * scale)
+    agents = {0: Agent(TTT), 1: Agent(TTT)}
+    for player_n, agent in agents.items():
+        agent.number = player_n
+    env = Environment(TTT)
+    trajectory = Trajectory()
+
+    def play_games():
+        for game_n in range(games_n):
+            env.reset()
+            play_game(env, agents, trajectory=trajectory)
+
+    return {'games': rate(play_games, games_n, repeat=1)}
+
+
+# ---- Scaling with size of games
+
+def mnk_benchmarks(game_cls, scale):
+    """Return games per second and size of sparse qvalues of game."""
+    seed()
+    games_n = int(200 * scale)
+    agents = {
+        player_n: Agent(game_cls, params={'sparse': 2 ** 20})
+        for player_n in [0, 1]
+    }
+    for player_n, agent in agents.items():
+        agent.number = player_n
+    env = Environment(game_cls)
+
+    def play_games():
+        for game_n in range(games_n):
+            env.reset()
+            play_game(env, agents)
+
+    games = rate(play_games, games_n, repeat=1)
+    rows = sum(len(agent.table) for agent in agents.values())
+    return {
+        'games': games,
+        'rows': metric(rows, "rows", better="lower"),
+        'size': metric(
+            rows * len(game_cls.actions) * agents[0].qvalues.itemsize,
+            "B", better="lower",
+        ),
+    }
+
+
+def mnk_benchmark(game_cls):
+    """Register benchmark of m,n,k-game class, named after it."""
+    def func(scale):
+        return mnk_benchmarks(game_cls, scale)
+    func.__name__ = game_cls.__name__.lower()
+    return benchmark(func)
+
+
+for mnk_cls in [MNK4x4k3, MNK5x5k4, ConnectFour]:
+    mnk_benchmark(mnk_cls)
+
+
+# ---- Run and compare
+
+def run(scale=1, names=None):
+    """Return results of benchmarks by name, then by metric."""
+    results = {}
+    for func in BENCHMARKS:
+        if names and func.__name__ not in names:
+            continue
+        for key, result in func(scale).items():
+            results["%s.%s" % (func.__name__, key)] = result
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return list of (name, change) of metrics worse than baseline.
+
+    change is the relative change of value, regressions being metrics that
+    got worse by more than threshold.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        reference = baseline[name]['value']
+        if not reference:
+            continue
+        change = (result['value'] - reference) / reference
+        worse = -change if result['better'] == "higher" else change
+        if worse > threshold:
+            regressions.append((name, change))
+    return regressions
+
+
+def display(results, baseline=None):
+    for name, result in sorted(results.items()):
+        line = "%-28s %14.1f %-6s" % (name, result['value'], result['unit'])
+        if baseline and name in baseline and baseline[name]['value']:
+            reference = baseline[name]['value']
+            line += " %+7.1f%%" % (
+                100 * (result['value'] - reference) / reference
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser("Benchmark hot paths of games and agents.")
+    parser.add_argument(
+        "names", nargs="*",
+        help="Benchmarks to run, default is all of them."
+    )
+    parser.add_argument(
+        "--scale", type=float, required=False, default=1,
+        help="Scale of number of iterations, default is 1."
+    )
+    parser.add_argument(
+        "--save", type=str, required=False, default=None,
+        help="Path where to save results, optional."
+    )
+    parser.add_argument(
+        "--compare", type=str, required=False, default=None,
+        help="Path to baseline results to compare with, optional."
+    )
+    parser.add_argument(
+        "--threshold", type=float, required=False, default=0.1,
+        help="Relative change making a regression, default is 0.1."
+    )
+    args = parser.parse_args()
+
+    results = run(scale=args.scale, names=args.names)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    display(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for name, change in regressions:
+            print("Regression of %s: %+.1f%%" % (name, 100 * change))
+        if regressions:
+            sys.exit(1)
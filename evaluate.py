@@ -0,0 +1,259 @@
+"""Evaluation of trained agents against other players.
+
+Agents play greedily (Agent.predict) as the player of their directory
+number, against players given by specs: "random" (random legal actions),
+"optimal" (@see games.solver) or the directory of a training, whose agent
+plays the other player. An invalid action loses the game.
+
+Checkpoints of a training all fold into its directory (@see
+qlearning.checkpoint), so earlier stages of a training are evaluated as
+opponents by keeping copies of its directory, or through other runs.
+
+    python evaluate.py results/<run>
+    python evaluate.py results/<run> -o optimal results/<earlier run>
+    python evaluate.py results/<run> results/<other run> --tournament
+"""
+import numpy as np
+import os
+import random
+from multiprocessing import Pool
+
+from games.game import INVALID_PLAY
+from games.solver import OptimalPlayer
+from games.tictactoe import TTT
+from qlearning.agent import Agent
+
+
+# Counts of games by outcome, the loser of an invalid action being recorded
+OUTCOMES = ["win_0", "tie", "win_1", "invalid_0", "invalid_1"]
+OPPONENTS = ["random", "optimal"]
+
+POLICIES = {}  # Policies loaded by a process, by spec and player number
+
+
+def get_policy(spec, number):
+    """Return function returning action of player given a state index.
+
+    Args:
+        spec (str): "random", "optimal" or directory of a training
+        number (int): player number
+    """
+    if (spec, number) in POLICIES:
+        return POLICIES[spec, number]
+    if spec == "random":
+        masks = TTT.legal_masks()
+        legal_actions = [
+            [action_n for action_n in TTT.actions if mask >> action_n & 1]
+            for mask in masks.tolist()
+        ]
+
+        def policy(state):
+            return random.choice(legal_actions[state])
+    elif spec == "optimal":
+        policy = OptimalPlayer(TTT, number).pick_action
+    else:
+        agent = Agent.from_directory(TTT, os.path.join(spec, str(number)))
+        agent.number = number
+        policy = agent.predict
+    POLICIES[spec, number] = policy
+    return policy
+
+
+def play_games(policies, games):
+    """Play games between policies and return counts by outcome.
+
+    Args:
+        policies (dict): policy by player number, @see get_policy
+        games (int): number of games
+
+    Returns:
+        (numpy.ndarray): counts of games in order of OUTCOMES
+    """
+    counts = np.zeros(len(OUTCOMES), dtype=np.int64)
+    game = TTT()
+    for game_n in range(games):
+        game.reset()
+        while not game.is_over():
+            player_n = game.player_n
+            action = policies[player_n](game.state())
+            if game.step(action, player_n) == INVALID_PLAY:
+                counts[OUTCOMES.index("invalid_%s" % player_n)] += 1
+                break
+        else:
+            if game.winner is None:
+                counts[OUTCOMES.index("tie")] += 1
+            else:
+                counts[OUTCOMES.index("win_%s" % game.winner.number)] += 1
+    return counts
+
+
+def play_task(task):
+    """Play a chunk of games of a match.
+
+    Args:
+        task (tuple): (specs, seed, games), specs being the specs of
+            players 0 and 1
+    """
+    specs, seed, games = task
+    random.seed(seed)
+    np.random.seed(seed)
+    policies = {
+        number: get_policy(spec, number)
+        for number, spec in enumerate(specs)
+    }
+    return play_games(policies, games)
+
+
+def evaluate(matches, games, workers=1, seed=None):
+    """Play games of matches, on a pool of processes if more than 1 worker.
+
+    Args:
+        matches (list of tuple): specs of players 0 and 1 of each match
+        games (int): number of games of each match
+        workers (int): number of processes
+        seed (int): seed of games, optional
+
+    Returns:
+        (numpy.ndarray): counts of games by match and outcome
+    """
+    if games < 1 or workers < 1:
+        raise ValueError("Evaluation needs at least 1 game and 1 worker.")
+    rng = random.Random(seed)
+    chunk = -(-games // workers)
+    tasks = []
+    for specs in matches:
+        for start in range(0, games, chunk):
+            size = min(chunk, games - start)
+            tasks.append((tuple(specs), rng.randrange(2 ** 32), size))
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(play_task, tasks)
+    else:
+        results = list(map(play_task, tasks))
+
+    counts = np.zeros((len(matches), len(OUTCOMES)), dtype=np.int64)
+    chunks_n = len(tasks) // len(matches) if matches else 0
+    for task_n, result in enumerate(results):
+        counts[task_n // chunks_n] += result
+    return counts
+
+
+def rates(counts, number):
+    """Return win, tie, loss and invalid rates of player given counts."""
+    counts = dict(zip(OUTCOMES, counts.tolist()))
+    other = 1 - number
+    games = sum(counts.values()) or 1
+    return {
+        'win': (
+            counts["win_%s" % number] + counts["invalid_%s" % other]
+        ) / games,
+        'tie': counts["tie"] / games,
+        'loss': (
+            counts["win_%s" % other] + counts["invalid_%s" % number]
+        ) / games,
+        'invalid': counts["invalid_%s" % number] / games,
+    }
+
+
+def numbers(run):
+    """Return player numbers of agents saved in directory of a training."""
+    return [
+        number for number in [0, 1]
+        if os.path.isdir(os.path.join(run, str(number)))
+    ]
+
+
+def match_specs(run, number, opponent):
+    specs = [opponent, opponent]
+    specs[number] = run
+    return tuple(specs)
+
+
+def display_rates(rows):
+    """Display rates given a list of (name, rates)."""
+    width = max([len(name) for name, row in rows] + [10])
+    print("%-*s %7s %7s %7s %7s" % (
+        width, "", "win", "tie", "loss", "invalid"
+    ))
+    for name, row in rows:
+        print("%-*s %6.1f%% %6.1f%% %6.1f%% %6.1f%%" % (
+            width, name, 100 * row['win'], 100 * row['tie'],
+            100 * row['loss'], 100 * row['invalid'],
+        ))
+
+
+def main(runs, opponents, games, workers=1, seed=None, tournament=False):
+    """Evaluate agents of runs against opponents, or against each other."""
+    if tournament:
+        # Agents 0 of runs against agents 1 of runs
+        matches = [
+            (run_0, run_1) for run_0 in runs for run_1 in runs
+        ]
+        counts = evaluate(matches, games, workers, seed)
+        print("Rates of agents 0 (rows) against agents 1, win/tie/loss:")
+        width = max(len(run) for run in runs)
+        print("%-*s %s" % (
+            width, "", " ".join("%17s" % run[-17:] for run in runs)
+        ))
+        for run_n, run in enumerate(runs):
+            cells = []
+            for counts_row in counts[run_n * len(runs):][:len(runs)]:
+                row = rates(counts_row, 0)
+                cells.append("%5.1f/%5.1f/%5.1f" % (
+                    100 * row['win'], 100 * row['tie'], 100 * row['loss']
+                ))
+            print("%-*s %s" % (width, run, " ".join(cells)))
+        return
+
+    matches = []
+    names = []
+    for run in runs:
+        for number in numbers(run):
+            for opponent in opponents:
+                matches.append(match_specs(run, number, opponent))
+                names.append((
+                    "%s vs %s" % (os.path.join(run, str(number)), opponent),
+                    number,
+                ))
+    counts = evaluate(matches, games, workers, seed)
+    display_rates([
+        (name, rates(match_counts, number))
+        for (name, number), match_counts in zip(names, counts)
+    ])
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser("Evaluate trained agents on TicTacToe.")
+    parser.add_argument(
+        "runs", nargs="+",
+        help="Directories of trainings, holding agents 0 and 1."
+    )
+    parser.add_argument(
+        "-o", "--opponents", nargs="+", required=False, default=OPPONENTS,
+        help=(
+            "Opponents, random, optimal or directories of trainings, "
+            "default is random and optimal."
+        )
+    )
+    parser.add_argument(
+        "-g", "--games", type=int, required=False, default=1000,
+        help="Number of games of each match, default is 1000."
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, required=False, default=1,
+        help="Number of processes playing games, default is 1."
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, required=False, default=None,
+        help="Seed of random generators, optional."
+    )
+    parser.add_argument(
+        "-t", "--tournament", action="store_true",
+        help="Play agents 0 of runs against agents 1 of runs."
+    )
+    args = parser.parse_args()
+    main(
+        args.runs, args.opponents, args.games,
+        workers=args.workers, seed=args.seed, tournament=args.tournament,
+    )
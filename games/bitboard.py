@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+from parameters import LOG_LEVEL
+from utils.log import get_logger
+from .game import (
+    GAME_OVER, INVALID_PLAY, INVALID_PLAYER, PLAYED, TIE, WON, Game,
+)
+from .tictactoe import Player, TTT, TTT_STATES
+
+
+FULL_BOARD = 0b111111111
+WIN_MASKS = [sum(1 << cell_n for cell_n in line) for line in TTT.lines]
+# Win masks going through each cell
+CELL_WIN_MASKS = [
+    [mask for mask in WIN_MASKS if mask & (1 << cell_n)]
+    for cell_n in range(9)
+]
+
+
+class BitTTT(Game):
+    """TicTacToe on bitboards, same API as games.tictactoe.TTT.
+
+    Board is stored as one 9-bit integer per player, bit n being set when
+    player played cell n.
+    """
+
+    actions = TTT.actions
+    states = TTT_STATES
+    symmetries = TTT.symmetries
+
+    _state_codes = None
+
+    def __init__(self):
+        super().__init__()
+        self.boards = [0, 0]
+        self.history = defaultdict(list)
+        self.winner = None
+        self.ended = False
+        self.players = [Player(0, "X"), Player(1, "O")]
+
+        self.log = get_logger(self.__class__.__name__, log_level=LOG_LEVEL)
+
+    def is_over(self):
+        return self.ended
+
+    def reset(self):
+        """Restart game in place, keeping players."""
+        self.boards[0] = self.boards[1] = 0
+        self.history.clear()
+        self.winner = None
+        self.ended = False
+        self.player_n = 0
+
+    def legal_mask(self):
+        """Return bitmask of legal actions, bit n being action n."""
+        return ~(self.boards[0] | self.boards[1]) & FULL_BOARD
+
+    @classmethod
+    def state_legal_mask(cls, state):
+        """Return bitmask of legal actions in state, bit n being action n."""
+        return TTT.state_legal_mask(state)
+
+    def step(self, action_n, player_n):
+        if self.ended:
+            return GAME_OVER
+        if player_n != self.player_n:
+            return INVALID_PLAYER
+
+        # Gather cell player want to play on
+        cell_n = self.cls.actions[action_n]
+        bit = 1 << cell_n
+        if (self.boards[0] | self.boards[1]) & bit:
+            return INVALID_PLAY
+
+        # Play
+        board = self.boards[player_n] | bit
+        self.boards[player_n] = board
+        self.player_n = 1 - player_n
+        self.history[self.players[player_n]].append(cell_n)
+
+        # Only lines going through played cell can be won
+        for mask in CELL_WIN_MASKS[cell_n]:
+            if board & mask == mask:
+                self.ended = True
+                self.winner = self.players[player_n]
+                return WON
+        if (self.boards[0] | self.boards[1]) == FULL_BOARD:
+            self.ended = True
+            return TIE
+        return PLAYED
+
+    def status_message(self, status, action_n, player_n):
+        if status == INVALID_PLAY:
+            return "Cell %s already played" % self.cls.actions[action_n]
+        return super().status_message(status, action_n, player_n)
+
+    # ---- Display
+
+    def display(self):
+        print(self.string())
+
+    def display_history(self):
+        from pprint import pprint
+        pprint(dict(self.history))
+
+    def symbols(self):
+        """Return list of cell symbols."""
+        symbols = []
+        for cell_n in range(9):
+            bit = 1 << cell_n
+            if self.boards[0] & bit:
+                symbols.append(self.players[0].symbol)
+            elif self.boards[1] & bit:
+                symbols.append(self.players[1].symbol)
+            else:
+                symbols.append(" ")
+        return symbols
+
+    def string(self):
+        board_frmt = (
+            " {} | {} | {} \n"
+            "---+---+---\n"
+            " {} | {} | {} \n"
+            "---+---+---\n"
+            " {} | {} | {} "
+        )
+        return board_frmt.format(*self.symbols())
+
+    # For learning
+
+    @staticmethod
+    def code(board_0, board_1):
+        """Return code of boards."""
+        return board_0 | board_1 << 9
+
+    @classmethod
+    def state_codes(cls):
+        """Return dictionary mapping board codes to state indexes."""
+        if cls._state_codes is None:
+            state_codes = {}
+            for index, state in enumerate(cls.states):
+                boards = [0, 0]
+                for cell_n, number in enumerate(state):
+                    if number >= 0:
+                        boards[number] |= 1 << cell_n
+                state_codes[cls.code(*boards)] = index
+            cls._state_codes = state_codes
+        return cls._state_codes
+
+    def state(self):
+        try:
+            return self.state_codes()[self.code(*self.boards)]
+        except KeyError:
+            msg = (
+                "Invalid State %s. History is %s."
+                % (self.boards, dict(self.history))
+            )
+            self.log.fatal(msg)
+            raise ValueError(msg)
@@ -1,8 +1,39 @@
+import numpy as np
+
+from .exceptions import GameOver, InvalidPlay, InvalidPlayer
+
+
+# Status of a step (@see Game.step), those above TIE leaving game unchanged
+PLAYED = 0
+WON = 1
+TIE = 2
+INVALID_PLAY = 3
+INVALID_PLAYER = 4
+GAME_OVER = 5
+STATUSES = [PLAYED, WON, TIE, INVALID_PLAY, INVALID_PLAYER, GAME_OVER]
+
+STATUS_ERRORS = {
+    INVALID_PLAY: InvalidPlay,
+    INVALID_PLAYER: InvalidPlayer,
+    GAME_OVER: GameOver,
+}
+
+
 class Game(object):
+    """Base of games.
+
+    states can be set with games.states.LazyStates so that they are only
+    built on first access. Games whose states cannot be enumerated leave
+    states to None, and their state method returns a compact non-negative
+    integer code of the state instead of its index, for agents with sparse
+    qvalues (@see qlearning.qtable).
+    """
 
     states = None
     actions = None
 
+    _legal_masks = None
+
     def __init__(self):
         self.cls = self.__class__
         self.player_n = 0  # Current Player
@@ -10,8 +41,66 @@ class Game(object):
     def is_over(self):
         raise NotImplementedError
 
-    def act(self, action, player):
+    def act(self, action_n, player_n):
+        """Play action for player, raise if invalid (@see step)."""
+        status = self.step(action_n, player_n)
+        if status > TIE:
+            msg = self.status_message(status, action_n, player_n)
+            self.log.debug(msg)
+            raise STATUS_ERRORS[status](msg)
+
+    def step(self, action_n, player_n):
+        """Play action for player and return status of step.
+
+        Does not raise nor log on invalid steps, which leave game unchanged.
+
+        Returns:
+            (int): PLAYED, WON or TIE if action was played, else
+                INVALID_PLAY, INVALID_PLAYER or GAME_OVER
+        """
         raise NotImplementedError
 
+    def status_message(self, status, action_n, player_n):
+        """Return message of invalid step status."""
+        if status == GAME_OVER:
+            return "Game is Over"
+        if status == INVALID_PLAYER:
+            return (
+                "Expecting player %s, got player %s."
+                % (self.player_n, player_n)
+            )
+        return "Action %s is invalid." % action_n
+
     def state(self):
+        """Return index of state in states, or code of state (@see Game)."""
+        raise NotImplementedError
+
+    def reset(self):
+        """Restart game in place."""
+        self.__init__()
+
+    def legal_mask(self):
+        """Return bitmask of legal actions, bit n being action n."""
         raise NotImplementedError
+
+    # For learning
+
+    @classmethod
+    def state_index(cls, state):
+        """Return index of state in states, raise ValueError if unknown."""
+        return cls.states.index(state)
+
+    @classmethod
+    def state_legal_mask(cls, state):
+        """Return bitmask of legal actions in state, bit n being action n."""
+        raise NotImplementedError
+
+    @classmethod
+    def legal_masks(cls):
+        """Return array of legal action bitmasks by state index."""
+        if cls._legal_masks is None:
+            cls._legal_masks = np.array(
+                [cls.state_legal_mask(state) for state in cls.states],
+                dtype=np.int64,
+            )
+        return cls._legal_masks
@@ -0,0 +1,232 @@
+from collections import defaultdict
+
+from parameters import LOG_LEVEL
+from utils.log import get_logger
+from .game import (
+    GAME_OVER, INVALID_PLAY, INVALID_PLAYER, PLAYED, TIE, WON, Game,
+)
+from .position import Position
+from .tictactoe import Player
+
+
+MNK_GAMES = {}
+
+
+def mnk_lines(m, n, k):
+    """Return list of cells of lines of k cells on a board of m x n cells.
+
+    Cells are numbered row by row, rows being m cells long.
+    """
+    lines = []
+    for cell_n in range(m * n):
+        position = Position(cell_n, width=m)
+        for di, dj in [(1, 0), (0, 1), (1, 1), (-1, 1)]:
+            i_end = position.i + (k - 1) * di
+            j_end = position.j + (k - 1) * dj
+            if 0 <= i_end < m and j_end < n:
+                lines.append(tuple(
+                    position.i + step * di + (position.j + step * dj) * m
+                    for step in range(k)
+                ))
+    return lines
+
+
+class MNK(Game):
+    """m,n,k-game on bitboards: first player to align k cells wins.
+
+    Board is m cells wide and n cells high, stored as one integer per
+    player, bit n being set when player played cell n, cells being numbered
+    row by row from the top. With gravity, actions are columns and cells are
+    played from the bottom up, as in Connect Four. Use mnk_game to get the
+    class of a game.
+
+    States are not enumerated, state returns a compact code of the board
+    (@see state), for agents with sparse qvalues.
+    """
+
+    m = None
+    n = None
+    k = None
+    gravity = False
+    actions = None
+
+    win_masks = None
+    cell_win_masks = None  # Win masks going through each cell
+    full_board = 0
+
+    def __init__(self):
+        super().__init__()
+        self.boards = [0, 0]
+        self.heights = [0] * self.m  # Number of cells played by column
+        self.code = self.initial_code()
+        self.history = defaultdict(list)
+        self.winner = None
+        self.ended = False
+        self.players = [Player(0, "X"), Player(1, "O")]
+
+        self.log = get_logger(self.__class__.__name__, log_level=LOG_LEVEL)
+
+    def is_over(self):
+        return self.ended
+
+    def reset(self):
+        """Restart game in place, keeping players."""
+        self.boards[0] = self.boards[1] = 0
+        self.heights[:] = [0] * self.m
+        self.code = self.initial_code()
+        self.history.clear()
+        self.winner = None
+        self.ended = False
+        self.player_n = 0
+
+    def legal_mask(self):
+        """Return bitmask of legal actions, bit n being action n."""
+        if self.gravity:
+            return sum(
+                1 << col
+                for col, height in enumerate(self.heights)
+                if height < self.n
+            )
+        return ~(self.boards[0] | self.boards[1]) & self.full_board
+
+    def step(self, action_n, player_n):
+        if self.ended:
+            return GAME_OVER
+        if player_n != self.player_n:
+            return INVALID_PLAYER
+
+        # Gather cell player want to play on
+        if self.gravity:
+            col = self.actions[action_n]
+            height = self.heights[col]
+            if height == self.n:
+                return INVALID_PLAY
+            cell_n = (self.n - 1 - height) * self.m + col
+            self.heights[col] = height + 1
+            # Column marker moves up, and cell is set for player 0
+            self.code += (1 + (player_n == 0)) << (col * (self.n + 1) + height)
+        else:
+            cell_n = self.actions[action_n]
+            if (self.boards[0] | self.boards[1]) >> cell_n & 1:
+                return INVALID_PLAY
+            self.code += (player_n + 1) * 3 ** cell_n
+
+        # Play
+        board = self.boards[player_n] | 1 << cell_n
+        self.boards[player_n] = board
+        self.player_n = 1 - player_n
+        self.history[self.players[player_n]].append(cell_n)
+
+        # Only lines going through played cell can be won
+        for mask in self.cell_win_masks[cell_n]:
+            if board & mask == mask:
+                self.ended = True
+                self.winner = self.players[player_n]
+                return WON
+        if (self.boards[0] | self.boards[1]) == self.full_board:
+            self.ended = True
+            return TIE
+        return PLAYED
+
+    def status_message(self, status, action_n, player_n):
+        if status == INVALID_PLAY:
+            if self.gravity:
+                return "Column %s is full" % self.actions[action_n]
+            return "Cell %s already played" % self.actions[action_n]
+        return super().status_message(status, action_n, player_n)
+
+    # ---- Display
+
+    def display(self):
+        print(self.string())
+
+    def display_history(self):
+        from pprint import pprint
+        pprint(dict(self.history))
+
+    def symbols(self):
+        """Return list of cell symbols."""
+        symbols = []
+        for cell_n in range(self.m * self.n):
+            if self.boards[0] >> cell_n & 1:
+                symbols.append(self.players[0].symbol)
+            elif self.boards[1] >> cell_n & 1:
+                symbols.append(self.players[1].symbol)
+            else:
+                symbols.append(" ")
+        return symbols
+
+    def string(self):
+        symbols = self.symbols()
+        rows = [
+            " " + " | ".join(symbols[row * self.m:(row + 1) * self.m]) + " "
+            for row in range(self.n)
+        ]
+        return ("\n" + "+".join(["---"] * self.m) + "\n").join(rows)
+
+    # For learning
+
+    @classmethod
+    def initial_code(cls):
+        """Return code of empty board."""
+        if cls.gravity:
+            return sum(1 << col * (cls.n + 1) for col in range(cls.m))
+        return 0
+
+    @classmethod
+    def code_bits(cls):
+        """Return number of bits of codes."""
+        if cls.gravity:
+            return cls.m * (cls.n + 1)
+        return (3 ** (cls.m * cls.n) - 1).bit_length()
+
+    def state(self):
+        """Return code of state.
+
+        Without gravity, code is the base 3 number whose digit n is 0 for an
+        empty cell n, else number of player plus one. With gravity, each
+        column has n + 1 bits: a bit marking its height, above which bits
+        are 0, and below which bits are set for cells of player 0.
+        """
+        return self.code
+
+
+def mnk_game(m, n, k, gravity=False):
+    """Return class of m,n,k-game, created once.
+
+    Args:
+        m (int): width of board
+        n (int): height of board
+        k (int): number of cells to align
+        gravity (bool): whether cells are played from the bottom of columns
+    """
+    key = (m, n, k, gravity)
+    if key not in MNK_GAMES:
+        lines = mnk_lines(m, n, k)
+        win_masks = [sum(1 << cell_n for cell_n in line) for line in lines]
+        name = "MNK%sx%sk%s%s" % (m, n, k, "Gravity" if gravity else "")
+        game_cls = type(name, (MNK,), {
+            'm': m,
+            'n': n,
+            'k': k,
+            'gravity': gravity,
+            'actions': list(range(m if gravity else m * n)),
+            'lines': lines,
+            'win_masks': win_masks,
+            'cell_win_masks': [
+                [mask for mask in win_masks if mask >> cell_n & 1]
+                for cell_n in range(m * n)
+            ],
+            'full_board': (1 << m * n) - 1,
+        })
+        if game_cls.code_bits() > 63:
+            raise ValueError("Codes of %s do not fit in 63 bits." % name)
+        MNK_GAMES[key] = game_cls
+    return MNK_GAMES[key]
+
+
+# Named after their class so that they can be pickled
+MNK4x4k3 = mnk_game(4, 4, 3)
+MNK5x5k4 = mnk_game(5, 5, 4)
+MNK7x6k4Gravity = mnk_game(7, 6, 4, gravity=True)
+ConnectFour = MNK7x6k4Gravity
@@ -1,12 +1,16 @@
 class Position(object):
 
-    def __init__(self, first, second=None):
+    def __init__(self, first, second=None, width=3):
+        """Create position from a position, cell number or coordinates.
+
+        Cells are numbered row by row, rows being width cells long.
+        """
         if isinstance(first, Position):
             self.i = first.i
             self.j = first.j
         elif second is None:
-            self.i = first % 3
-            self.j = first // 3
+            self.i = first % width
+            self.j = first // width
         else:
             self.i = first
             self.j = second
@@ -0,0 +1,156 @@
+import numpy as np
+import random
+
+
+SOLUTIONS = {}
+
+# Values of states and actions for the player to play
+WIN = 1
+TIE = 0
+LOSS = -1
+ILLEGAL = -2  # Value of illegal actions
+
+
+class Solution(object):
+    """Game-theoretic values of all states of a game, solved by minimax.
+
+    Game class must be a board game of states and lines like TTT: states
+    are tuples of cell contents, -1 for empty and player number otherwise,
+    player 0 plays first, actions are cells, and a player owning all cells
+    of one of lines wins. States are solved once each, their values being
+    kept by state index, so a search never explores a state twice.
+
+    Attributes:
+        values (numpy.ndarray): value of state for its player to play, by
+            state index
+        action_values (numpy.ndarray): value of action for player to play,
+            by state index and action, ILLEGAL for illegal actions and all
+            actions of ended games
+    """
+
+    def __init__(self, game_cls):
+        self.game_cls = game_cls
+        self.actions = list(game_cls.actions)
+        self.lines = game_cls.lines
+        states_n = len(game_cls.states)
+        self.values = np.full(states_n, ILLEGAL, dtype=np.int8)
+        self.action_values = np.full(
+            (states_n, len(self.actions)), ILLEGAL, dtype=np.int8
+        )
+        for state in game_cls.states:
+            self.solve(state)
+
+    def winner(self, state):
+        """Return number of a player owning a line, None if none."""
+        for line in self.lines:
+            number = state[line[0]]
+            if number >= 0 and all(state[cell_n] == number for cell_n in line):
+                return number
+        return None
+
+    def solve(self, state):
+        """Return value of state for player to play, solving it if needed."""
+        index = self.game_cls.state_index(state)
+        if self.values[index] != ILLEGAL:
+            return self.values[index]
+
+        player_n = int(state.count(0) > state.count(1))
+        winner = self.winner(state)
+        if winner is not None:
+            value = WIN if winner == player_n else LOSS
+        elif -1 not in state:
+            value = TIE
+        else:
+            value = LOSS
+            for action_n, cell_n in enumerate(self.actions):
+                if state[cell_n] >= 0:
+                    continue
+                child = list(state)
+                child[cell_n] = player_n
+                action_value = -self.solve(tuple(child))
+                self.action_values[index, action_n] = action_value
+                value = max(value, action_value)
+        self.values[index] = value
+        return value
+
+    def best_actions(self, state):
+        """Return list of optimal actions in state (by index)."""
+        values = self.action_values[state]
+        return np.flatnonzero(values == self.values[state]).tolist()
+
+    def is_playable(self):
+        """Return array of whether game is not over, by state index."""
+        return (self.action_values != ILLEGAL).any(axis=1)
+
+    def optimal_rate(self, actions, states=None):
+        """Return rate of optimal actions among actions played in states.
+
+        States where game is over are ignored.
+
+        Args:
+            actions (numpy.ndarray): action played in each state
+            states (numpy.ndarray): indexes of states, default is all states
+        """
+        actions = np.asarray(actions)
+        if states is None:
+            states = np.arange(len(self.values))
+        states = np.asarray(states)
+        playable = self.is_playable()[states]
+        states, actions = states[playable], actions[playable]
+        values = self.action_values[states, actions]
+        return float((values == self.values[states]).mean())
+
+    def qvalues(self, rewards):
+        """Return qvalues by state and action from game outcomes.
+
+        Args:
+            rewards (dict): 'win', 'tie', 'lose' and 'invalid' rewards, @see
+                qlearning.environment.Environment.rewards
+        """
+        qvalues = np.empty(self.action_values.shape)
+        for value, key in [
+            (WIN, 'win'), (TIE, 'tie'), (LOSS, 'lose'), (ILLEGAL, 'invalid'),
+        ]:
+            qvalues[self.action_values == value] = rewards[key]
+        return qvalues
+
+
+def get_solution(game_cls):
+    """Return Solution of game class, solved once."""
+    if game_cls not in SOLUTIONS:
+        SOLUTIONS[game_cls] = Solution(game_cls)
+    return SOLUTIONS[game_cls]
+
+
+class OptimalPlayer(object):
+    """Opponent playing one of optimal actions, for play_game of main.
+
+    It plays like an agent that does not learn.
+    """
+
+    def __init__(self, game_cls, number):
+        self.solution = get_solution(game_cls)
+        self.number = number
+
+    def pick_action(self, state):
+        """Return one of optimal actions, any action if game is over."""
+        actions = self.solution.best_actions(state)
+        if not actions:
+            return random.randrange(len(self.solution.actions))
+        return random.choice(actions)
+
+    def predict(self, state):
+        actions = self.solution.best_actions(state)
+        return actions[0] if actions else 0
+
+    def update_step(self, trajectory, player_n, next_state):
+        pass
+
+    def update_trajectory(self, trajectory, player_n, final_state):
+        pass
+
+    def update_params(self):
+        pass
+
+    def __str__(self):
+        return "Optimal%s" % self.number
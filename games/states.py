@@ -0,0 +1,101 @@
+import numpy as np
+import os
+
+from parameters import CACHE_DIR
+
+
+class States(object):
+    """Read-only sequence of states backed by a 2D array.
+
+    States are returned as tuples, and their index is looked up through a
+    dictionary built on first call to index.
+    """
+
+    def __init__(self, array):
+        self.array = array
+        self._indexes = None
+
+    @property
+    def indexes(self):
+        """Return dictionary mapping each state to its index."""
+        if self._indexes is None:
+            self._indexes = {state: index for index, state in enumerate(self)}
+        return self._indexes
+
+    def index(self, state):
+        """Return index of state, raise ValueError if unknown."""
+        try:
+            return self.indexes[tuple(state)]
+        except KeyError:
+            raise ValueError("%s is not in states" % (state,))
+
+    def __contains__(self, state):
+        return tuple(state) in self.indexes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [tuple(row) for row in self.array[index].tolist()]
+        return tuple(self.array[index].tolist())
+
+    def __iter__(self):
+        for row in self.array.tolist():
+            yield tuple(row)
+
+    def __len__(self):
+        return len(self.array)
+
+
+class LazyStates(object):
+    """Descriptor building the states of a game class on first access.
+
+    Built states are cached in CACHE_DIR under name and version, so that
+    other processes map the cache read-only instead of building it again.
+    Bump version whenever build changes.
+    """
+
+    def __init__(self, build, name, version=0, dtype=np.int8):
+        """Create lazy states.
+
+        Args:
+            build (callable): return an iterable over all states
+            name (str): name of cache file
+            version (int): version of states, part of cache file name
+            dtype (numpy.dtype): type of state values
+        """
+        self.build = build
+        self.name = name
+        self.version = version
+        self.dtype = dtype
+        self.states = None
+
+    @property
+    def path(self):
+        file_name = "%s-v%s.npy" % (self.name, self.version)
+        return os.path.join(CACHE_DIR, file_name)
+
+    def load(self):
+        """Return array of states, from cache if possible."""
+        try:
+            return np.load(self.path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+        array = np.array(list(self.build()), dtype=self.dtype)
+        self.save(array)
+        return array
+
+    def save(self, array):
+        """Write array of states to cache, ignore failures."""
+        tmp_path = "%s.%s.tmp" % (self.path, os.getpid())
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_path, "wb") as file:
+                np.save(file, array)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def __get__(self, instance, owner):
+        if self.states is None:
+            self.states = States(self.load())
+        return self.states
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+SYMMETRIES = {}
+
+
+def dihedral_permutations(size):
+    """Return the 8 cell permutations of the symmetries of a square board.
+
+    A permutation p transforms a state s into the state s' where
+    s'[n] = s[p[n]], cells being numbered row by row. Identity comes first.
+    """
+    def cell(row, col):
+        return row * size + col
+
+    rotation = [
+        cell(size - 1 - col, row)
+        for row in range(size) for col in range(size)
+    ]
+    reflection = [
+        cell(row, size - 1 - col)
+        for row in range(size) for col in range(size)
+    ]
+    permutations = [list(range(size * size))]
+    for permutation in permutations:
+        for other in [rotation, reflection]:
+            composed = [permutation[cell_n] for cell_n in other]
+            if composed not in permutations:
+                permutations.append(composed)
+    return permutations
+
+
+class Symmetry(object):
+    """Map states of a game to the canonical state of their symmetry class.
+
+    Game class must define symmetries, a list of cell permutations (@see
+    dihedral_permutations), identity first, and actions must be cells.
+    Canonical state of a state is the smallest of its transformations.
+
+    Attributes:
+        size (int): number of canonical states
+        rows (numpy.ndarray): rank of canonical state among canonical
+            states, by state index
+        transforms (numpy.ndarray): index of permutation transforming state
+            into its canonical state, by state index
+        action_maps (numpy.ndarray): canonical action of action, by
+            transform and action
+        inverse_action_maps (numpy.ndarray): action of canonical action, by
+            transform and canonical action
+    """
+
+    def __init__(self, game_cls):
+        permutations = game_cls.symmetries
+        actions = list(game_cls.actions)
+
+        canonicals = {}
+        rows = []
+        transforms = []
+        for state in game_cls.states:
+            transformed = [
+                tuple(state[cell_n] for cell_n in permutation)
+                for permutation in permutations
+            ]
+            canonical = min(transformed)
+            rows.append(canonicals.setdefault(canonical, len(canonicals)))
+            transforms.append(transformed.index(canonical))
+        self.size = len(canonicals)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.transforms = np.array(transforms, dtype=np.int64)
+
+        # Cell n of state is cell inverse[n] of transformed state
+        self.action_maps = np.zeros(
+            (len(permutations), len(actions)), dtype=np.int64
+        )
+        for transform, permutation in enumerate(permutations):
+            for new_cell_n, cell_n in enumerate(permutation):
+                self.action_maps[transform, actions.index(cell_n)] = (
+                    actions.index(new_cell_n)
+                )
+        self.inverse_action_maps = np.argsort(self.action_maps, axis=1)
+
+    def row(self, state):
+        """Return row of canonical state and canonical action of actions."""
+        return (
+            self.rows[state],
+            self.action_maps[self.transforms[state]],
+        )
+
+
+def get_symmetry(game_cls):
+    """Return Symmetry of game class, created once."""
+    if game_cls not in SYMMETRIES:
+        SYMMETRIES[game_cls] = Symmetry(game_cls)
+    return SYMMETRIES[game_cls]
@@ -1,12 +1,17 @@
+import numpy as np
 from collections import defaultdict
 from itertools import product
 
 from parameters import LOG_LEVEL
 from utils.list import are_same
-from utils.log import create_logger
-from .exceptions import GameOver, InvalidPlay, InvalidPlayer
-from .game import Game
+from utils.log import get_logger
+from .exceptions import InvalidPlay
+from .game import (
+    GAME_OVER, INVALID_PLAY, INVALID_PLAYER, PLAYED, TIE, WON, Game,
+)
 from .position import Position
+from .states import LazyStates
+from .symmetry import dihedral_permutations
 
 
 class Player(object):
@@ -32,7 +37,7 @@ class Cell(object):
         self.content = None
         self.position = Position(i, j)
 
-        self.log = create_logger(self.__class__.__name__, log_level=LOG_LEVEL)
+        self.log = get_logger(self.__class__.__name__, log_level=LOG_LEVEL)
 
     @property
     def symbol(self):
@@ -98,15 +103,38 @@ def states_filter(state):
     return len(winners) <= 1
 
 
-class TTT(Game):
-
-    actions = list(range(9))
-    states = list(filter(
+def build_states():
+    """Return iterator over possible states."""
+    return filter(
         states_filter,
         product(
             *[[-1, 0, 1] for cell_n in range(9)]
         )
-    ))
+    )
+
+
+TTT_STATES = LazyStates(build_states, "TTT", version=1)
+# Cells of winning lines
+LINES = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Rows
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Cols
+    (0, 4, 8), (2, 4, 6),  # Diags
+]
+# Winning lines going through each cell
+CELL_LINES = [
+    [line_n for line_n, line in enumerate(LINES) if cell_n in line]
+    for cell_n in range(9)
+]
+
+
+class TTT(Game):
+
+    actions = list(range(9))
+    states = TTT_STATES
+    lines = LINES
+    symmetries = dihedral_permutations(3)
+
+    _code_indexes = None
 
     def __init__(self):
         super().__init__()
@@ -119,11 +147,38 @@ class TTT(Game):
         self.ended = False
         self.players = [Player(0, "X"), Player(1, "O")]
 
-        self.log = create_logger(self.__class__.__name__, log_level=LOG_LEVEL)
+        # Updated on each action: number of cells of each line played by
+        # each player, number of cells played and base 3 code of state
+        self.line_counts = [[0] * len(LINES), [0] * len(LINES)]
+        self.played_n = 0
+        self.state_code = 0
+
+        self.log = get_logger(self.__class__.__name__, log_level=LOG_LEVEL)
 
     def is_over(self):
         return self.ended
 
+    def reset(self):
+        """Restart game in place, keeping cells and players."""
+        for cell in self.cells:
+            cell.content = None
+        self.history.clear()
+        self.winner = None
+        self.ended = False
+        self.player_n = 0
+        for counts in self.line_counts:
+            counts[:] = [0] * len(LINES)
+        self.played_n = 0
+        self.state_code = 0
+
+    def legal_mask(self):
+        """Return bitmask of legal actions, bit n being action n."""
+        return sum(
+            1 << action_n
+            for action_n, cell_n in enumerate(self.cls.actions)
+            if self.cells[cell_n].is_empty()
+        )
+
     def cell(self, *args):
         pos = Position(*args)
         return self.cells[pos.i + pos.j * 3]
@@ -175,31 +230,52 @@ class TTT(Game):
         else:
             self.ended = -1 not in map(lambda x: x.number, self.cells)
 
-    def act(self, action_n, player_n):
-        # Check if game is over
+    def step(self, action_n, player_n):
         if self.ended:
-            self.ended = True
-            self.log.debug("Trying to play when game is over.")
-            raise GameOver("Game is Over")
-
-        # Check the player is the one expected
+            return GAME_OVER
         if player_n != self.player_n:
-            msg = (
-                "Expecting player %s, got player %s."
-                % (self.player_n, player_n)
-            )
-            self.log.debug(msg)
-            raise InvalidPlayer(msg)
+            return INVALID_PLAYER
 
         # Gather cell player want to play on
         cell_n = self.cls.actions[action_n]
-        player = self.players[player_n]
+        cell = self.cells[cell_n]
+        if cell.content is not None:
+            return INVALID_PLAY
 
         # Play
-        self.cells[cell_n].play(player)
-        self.player_n = 1 - self.player_n
+        player = self.players[player_n]
+        cell.content = player
+        self.player_n = 1 - player_n
         self.history[player].append(cell_n)
-        self.check_end()
+        self.state_code += (player_n + 1) * 3 ** cell_n
+        return self.update_end(cell_n, player_n)
+
+    def status_message(self, status, action_n, player_n):
+        if status == INVALID_PLAY:
+            cell = self.cells[self.cls.actions[action_n]]
+            return (
+                "Cell at %s already played by %s"
+                % (cell.position, cell.content)
+            )
+        return super().status_message(status, action_n, player_n)
+
+    def update_end(self, cell_n, player_n):
+        """Update end of game after player played cell, return status.
+
+        Only lines going through cell are looked at.
+        """
+        self.played_n += 1
+        counts = self.line_counts[player_n]
+        for line_n in CELL_LINES[cell_n]:
+            counts[line_n] += 1
+            if counts[line_n] == 3:
+                self.ended = True
+                self.winner = self.players[player_n]
+                return WON
+        if self.played_n == len(self.cells):
+            self.ended = True
+            return TIE
+        return PLAYED
 
     # ---- Display
 
@@ -222,16 +298,43 @@ class TTT(Game):
 
     # For learning
 
-    def state_index(self, state):
-        return self.cls.states.index(state)
+    @classmethod
+    def state_legal_mask(cls, state):
+        """Return bitmask of legal actions in state, bit n being action n."""
+        return sum(
+            1 << action_n
+            for action_n, cell_n in enumerate(cls.actions)
+            if state[cell_n] < 0
+        )
+
+    @staticmethod
+    def code(state):
+        """Return base 3 code of state, empty cells being 0."""
+        return sum(
+            (number + 1) * 3 ** cell_n for cell_n, number in enumerate(state)
+        )
+
+    @classmethod
+    def code_indexes(cls):
+        """Return array mapping base 3 codes to state indexes.
+
+        Codes of impossible states are mapped to -1.
+        """
+        if cls._code_indexes is None:
+            code_indexes = np.full(3 ** len(cls.actions), -1, dtype=np.int32)
+            for index, state in enumerate(cls.states):
+                code_indexes[cls.code(state)] = index
+            cls._code_indexes = code_indexes
+        return cls._code_indexes
 
     def state(self):
-        try:
+        index = self.code_indexes()[self.state_code]
+        if index < 0:
             state = tuple([cell.number for cell in self.cells])
-            return self.state_index(state)
-        except ValueError as exc:
-            self.log.fatal(
+            msg = (
                 "Invalid State %s. History is %s."
                 % (state, dict(self.history))
             )
-            raise exc
+            self.log.fatal(msg)
+            raise ValueError(msg)
+        return int(index)
@@ -1,80 +1,287 @@
+import numpy as np
 import os
+import random
+import signal
 from datetime import datetime
+from multiprocessing import Pool
 
+from games.game import INVALID_PLAY
+from games.solver import get_solution
 from games.tictactoe import TTT
 from qlearning.agent import Agent
+from qlearning.checkpoint import Checkpointer
 from qlearning.environment import Environment
-from qlearning.experience import Experience
+from qlearning.trajectory import Trajectory
 from parameters import RESULT_DIR
+from report import METRICS_FILE, report
+from utils.metrics import MetricsWriter
+from utils.profiling import Profiler, Progress
 
 
-def play_game(env, agents):
-    """Play a game between the 2 agents, and learn from the game."""
+def play_game(env, agents, profiler=None, trajectory=None):
+    """Play a game between the 2 agents, and learn from the game.
 
-    history = {0: {}, 1: {}}
+    Moves are recorded in trajectory (qlearning.trajectory.Trajectory),
+    to reuse from game to game if given. Agents learn from it after each
+    move or at the end of game (@see Agent.update_trajectory).
+
+    Time phases and count steps of game if given a utils.profiling.Profiler.
+    """
+    timed = profiler is not None
+    if timed:
+        tic = profiler.start()
+
+    if trajectory is None:
+        trajectory = Trajectory()
+    trajectory.clear()
     game_rewards = {0: 0, 1: 0}
     while not env.game.is_over():
         for player_n, agent in agents.items():
-            if history[player_n]:
-                exp = Experience(
-                    state=history[player_n]['state'],
-                    action=history[player_n]['action'],
-                    reward=history[player_n]['reward'],
-                    next_state=env.state(),
-                )
-                agent.update_qvalue(exp)
             state = env.state()
+            if timed:
+                tic = profiler.stop('encode', tic)
+            if trajectory.lengths[player_n]:
+                agent.update_step(trajectory, player_n, state)
+                if timed:
+                    tic = profiler.stop('update', tic)
             action = agent.pick_action(state)
-            rewards = env.act(action, agent.number)
+            if timed:
+                tic = profiler.stop('select', tic)
+            status, rewards = env.step(action, agent.number)
+            if timed:
+                tic = profiler.stop('step', tic)
+                profiler.count('steps')
+                if status == INVALID_PLAY:
+                    profiler.count('invalid')
 
             game_rewards[0] += rewards[0]
             game_rewards[1] += rewards[1]
 
-            history[player_n] = {
-                'state': state,
-                'action': action,
-                'reward': rewards[player_n],
-            }
-
+            trajectory.record(player_n, state, action, rewards[player_n])
             other_player = 1 - player_n
-            if history[other_player]:
-                history[other_player]['reward'] += rewards[other_player]
+            trajectory.reward(other_player, rewards[other_player])
 
     state = env.state()
-    for player_n, hist in history.items():
-        if hist:
-            exp = Experience(
-                state=hist['state'],
-                action=hist['action'],
-                reward=hist['reward'],
-                next_state=env.state(),
-            )
-            agents[player_n].update_qvalue(exp)
+    for player_n, agent in agents.items():
+        agent.update_trajectory(trajectory, player_n, state)
 
     for agent in agents.values():
         agent.update_params()
 
+    if timed:
+        profiler.stop('update', tic)
+        profiler.count('games')
+
     return game_rewards
 
 
-def main(iterations, load_dir, params):
-    """Play games to teach 2 agents how to play."""
+def train(env, agents, iterations, profiler=None):
+    """Play games one after another, yield rewards of each game."""
+    trajectory = Trajectory()
+    for i in range(iterations):
+        env.reset()
+        yield play_game(
+            env, agents, profiler=profiler, trajectory=trajectory
+        )
+
+
+# ---- Multi-process training
+
+WORKER = {}
+
+
+def init_worker(rewards, params, shared=None):
+    """Create environment and agents of a worker process.
+
+    Agents are created with params, and attach to shared qvalues if given,
+    by player number.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    WORKER['env'] = Environment(TTT, rewards=rewards)
+    WORKER['agents'] = {
+        player_n: Agent(TTT, params=params[player_n])
+        for player_n in [0, 1]
+    }
+    for player_n, agent in WORKER['agents'].items():
+        agent.number = player_n
+        if shared:
+            agent.attach_qvalues(shared[player_n])
+
+
+def play_batch(task):
+    """Play a batch of games with copies of agents.
+
+    Args:
+        task (tuple): (qvalues, params, seed, games) where qvalues and params
+            are dictionaries of agent qvalues and params by player number,
+            qvalues being None when agents learn into shared qvalues
+
+    Returns:
+        (dict, dict, list): qvalues updates (None if shared) and extras of
+            agents by player number, rewards of each game
+    """
+    qvalues, params, seed, games = task
+    random.seed(seed)
+    np.random.seed(seed)
+
+    env = WORKER['env']
+    agents = WORKER['agents']
+    for player_n, agent in agents.items():
+        if qvalues is not None:
+            agent.set_qvalues(qvalues[player_n].copy())
+        agent.set_params(**params[player_n])
+        agent.set_extras(cumul_reward=0, updates_n=0)
+
+    games_rewards = list(train(env, agents, games))
+    updates = None
+    if qvalues is not None:
+        updates = {
+            player_n: agent.qvalues - qvalues[player_n]
+            for player_n, agent in agents.items()
+        }
+    extras = {
+        player_n: dict(agent.extras)
+        for player_n, agent in agents.items()
+    }
+    return updates, extras, games_rewards
+
+
+def train_parallel(
+    env, agents, iterations, workers, batch_size, seed=None, lock_n=None
+):
+    """Play games on a pool of processes, yield rewards of each game.
+
+    Each round, every worker plays up to batch_size games against copies of
+    the agents. Their qvalue updates are then summed into agents in worker
+    order, so a run is reproducible given its seed, and the exploration rate
+    decays as if games had been played one after another.
+
+    If lock_n is not None, workers rather update shared agent qvalues in
+    place, holding row locks if lock_n > 0. Runs are then not reproducible.
+    """
+    rng = random.Random(seed)
+    shared = None
+    if lock_n is not None:
+        shared = {
+            player_n: agent.share_qvalues(lock_n)
+            for player_n, agent in agents.items()
+        }
+    params = {
+        player_n: agent.params
+        for player_n, agent in agents.items()
+    }
+    pool = Pool(
+        workers, initializer=init_worker,
+        initargs=(env.rewards, params, shared),
+    )
+
+    played = 0
+    try:
+        while played < iterations:
+            batch = min(batch_size, -(-(iterations - played) // workers))
+            sizes = [
+                min(batch, max(iterations - played - worker_n * batch, 0))
+                for worker_n in range(workers)
+            ]
+            qvalues = None
+            if shared is None:
+                qvalues = {
+                    player_n: agent.qvalues
+                    for player_n, agent in agents.items()
+                }
+            params = {
+                player_n: agent.params
+                for player_n, agent in agents.items()
+            }
+            tasks = [
+                (qvalues, params, rng.randrange(2 ** 32), size)
+                for size in sizes if size
+            ]
+            for updates, extras, games_rewards in pool.map(play_batch, tasks):
+                for player_n, agent in agents.items():
+                    if updates is not None:
+                        agent.qvalues += updates[player_n]
+                        agent.dirty |= updates[player_n].any(axis=1)
+                    agent.extras['cumul_reward'] += (
+                        extras[player_n]['cumul_reward']
+                    )
+                    agent.extras['updates_n'] += extras[player_n]['updates_n']
+                for game_rewards in games_rewards:
+                    yield game_rewards
+
+            games = sum(sizes)
+            played += games
+            for agent in agents.values():
+                agent.params['exploration_rate'] = max(
+                    agent.params['exploration_rate']
+                    * agent.params['exploration_decay'] ** games,
+                    agent.params['exploration_min']
+                )
+    finally:
+        pool.terminate()
+        pool.join()
+        if shared:
+            for agent in agents.values():
+                agent.unshare_qvalues()
+
+
+def main(
+    iterations, load_dir, params,
+    workers=1, batch_size=100, seed=None, lock_n=None,
+    checkpoint_every=0, resume=False, timers=False, warm_start=False,
+):
+    """Play games to teach 2 agents how to play.
+
+    Games are played on workers processes if more than one, learning into
+    shared qvalues if lock_n is not None (@see train_parallel).
+
+    Agents are checkpointed every checkpoint_every games if not 0. When
+    resuming, agents are loaded from and saved to load_dir.
+
+    Phases of games are timed if timers, when played in this process.
 
-    # Create agents and list of cumulated rewards
+    If warm_start, agents start from qvalues of game outcomes under optimal
+    play (@see games.solver).
+
+    Rewards of games are streamed to a metrics file next to saved agents,
+    @see report.py to plot them.
+    """
+
+    if resume and not load_dir:
+        raise ValueError("Resuming a training needs its load directory.")
+
+    # Create agents
     if load_dir:
         agents = {
-            0: Agent(TTT, params=params),
-            1: Agent(TTT, params=params),
+            0: Agent.from_directory(TTT, os.path.join(load_dir, "0")),
+            1: Agent.from_directory(TTT, os.path.join(load_dir, "1")),
         }
-        agents[0].load(os.path.join(load_dir, "0"))
-        agents[1].load(os.path.join(load_dir, "1"))
     else:
         agents = {
             0: Agent(TTT, params=params),
             1: Agent(TTT, params=params),
         }
-    rewards_per_game = {0: [], 1: []}
-    total_rewards = {0: [], 1: []}
+
+    if workers > 1 and agents[0].table is not None:
+        raise ValueError("Agents with sparse qvalues train on one process.")
+
+    # Where to save agents
+    if resume:
+        directory = load_dir
+    else:
+        date_str = "{:%Y-%m-%dT%HH%M}".format(datetime.now())
+        directory = os.path.join(RESULT_DIR, date_str)
+    checkpointers = {}
+    if checkpoint_every:
+        checkpointers = {
+            agent_n: Checkpointer(agent, os.path.join(directory, str(agent_n)))
+            for agent_n, agent in agents.items()
+        }
+    metrics = MetricsWriter(
+        os.path.join(directory, METRICS_FILE),
+        ["game", "reward_0", "reward_1", "cumul_reward_0", "cumul_reward_1"],
+    )
+    played = agents[0].extras['updates_n']
 
     # Environment for learning
     env = Environment(
@@ -88,41 +295,61 @@ def main(iterations, load_dir, params):
         },
     )
 
+    if warm_start:
+        qvalues = get_solution(TTT).qvalues(env.rewards)
+        for agent in agents.values():
+            agent.warm_start(qvalues)
+
     # Iterations
+    profiler = Profiler() if timers else None
+    if workers > 1:
+        games = train_parallel(
+            env, agents, iterations, workers, batch_size,
+            seed=seed, lock_n=lock_n,
+        )
+    else:
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+        games = train(env, agents, iterations, profiler=profiler)
+    progress = Progress(iterations)
     try:
-        for i in range(iterations):
-            env.reset()
-            print("\r%s / %s" % (i+1, iterations), end="")
-            game_rewards = play_game(env, agents)
-            for player_n in [0, 1]:
-                rewards_per_game[player_n].append(game_rewards[player_n])
-                total_rewards[player_n].append(
-                    agents[player_n].extras['cumul_reward']
-                )
+        for i, game_rewards in enumerate(games):
+            progress.update(i + 1)
+            metrics.append(
+                played + i + 1, game_rewards[0], game_rewards[1],
+                agents[0].extras['cumul_reward'],
+                agents[1].extras['cumul_reward'],
+            )
+            if checkpointers and (i + 1) % checkpoint_every == 0:
+                metrics.flush()
+                for checkpointer in checkpointers.values():
+                    checkpointer.checkpoint()
     except KeyboardInterrupt:
         pass
     print()
+    metrics.close()
+    for field in ["reward_0", "reward_1"]:
+        print("%s: %s" % (field, metrics.aggregates[field]))
+    if profiler is not None:
+        print(profiler.summary())
 
     # Save agents
-    date_str = "{:%Y-%m-%dT%HH%M}".format(datetime.now())
-    directory = os.path.join(RESULT_DIR, date_str)
+    for checkpointer in checkpointers.values():
+        try:
+            checkpointer.close()
+        except Exception:
+            # Saving agents below replaces checkpoints
+            checkpointer.agent.log.warning(
+                "Checkpoints failed, saving whole agent."
+            )
     for agent_n, agent in agents.items():
         agent.save(os.path.join(directory, str(agent_n)))
 
     # ----------------------------------------------------------------------- #
     # Plot
 
-    # Display cumulated rewards
-    import matplotlib.pyplot as plt
-    plt.plot(rewards_per_game[0], label="GameReward_%s" % agents[0])
-    plt.plot(rewards_per_game[1], label="GameReward_%s" % agents[1])
-    plt.legend()
-    plt.show()
-
-    plt.plot(total_rewards[0], label="CumulReward_%s" % agents[0])
-    plt.plot(total_rewards[1], label="CumulReward_%s" % agents[1])
-    plt.legend()
-    plt.show()
+    report(directory)
 
 
 if __name__ == "__main__":
@@ -136,6 +363,52 @@ if __name__ == "__main__":
         "-l", "--load_dir", type=str, required=False, default=None,
         help="Directory from where to load agents, optional."
     )
+    parser.add_argument(
+        "-w", "--workers", type=int, required=False, default=1,
+        help="Number of processes playing games, default is 1."
+    )
+    parser.add_argument(
+        "-b", "--batch_size", type=int, required=False, default=100,
+        help=(
+            "Number of games played by each worker between agent syncs, "
+            "default is 100."
+        )
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, required=False, default=None,
+        help="Seed of random generators, optional."
+    )
+    parser.add_argument(
+        "--shared", action="store_true",
+        help="Workers learn into shared qvalues instead of copies."
+    )
+    parser.add_argument(
+        "--locks", type=int, required=False, default=0,
+        help=(
+            "Number of row locks of shared qvalues, "
+            "default is 0 (lock-free updates)."
+        )
+    )
+    parser.add_argument(
+        "-c", "--checkpoint_every", type=int, required=False, default=0,
+        help="Number of games between checkpoints, default is 0 (never)."
+    )
+    parser.add_argument(
+        "-r", "--resume", action="store_true",
+        help="Resume training of agents, saving them to load directory."
+    )
+    parser.add_argument(
+        "--warm_start", action="store_true",
+        help="Start from qvalues of game outcomes under optimal play."
+    )
+    parser.add_argument(
+        "--timers", action="store_true",
+        help="Time phases of games and display a summary, single process."
+    )
+    parser.add_argument(
+        "--profile", type=str, required=False, default=None,
+        help="Path where to write cProfile stats of the run, optional."
+    )
     for key, default in Agent.params.items():
         parser.add_argument(
             "--%s" % key, type=type(default),
@@ -147,4 +420,15 @@ if __name__ == "__main__":
         key: eval("args.%s" % key)
         for key in Agent.params
     }
-    main(iterations=args.iterations, load_dir=args.load_dir, params=params)
+    kwargs = dict(
+        iterations=args.iterations, load_dir=args.load_dir, params=params,
+        workers=args.workers, batch_size=args.batch_size, seed=args.seed,
+        lock_n=args.locks if args.shared else None,
+        checkpoint_every=args.checkpoint_every, resume=args.resume,
+        timers=args.timers, warm_start=args.warm_start,
+    )
+    if args.profile:
+        import cProfile
+        cProfile.run("main(**kwargs)", args.profile)
+    else:
+        main(**kwargs)
@@ -1,2 +1,3 @@
 LOG_LEVEL = "INFO"
 RESULT_DIR = "results"
+CACHE_DIR = "cache"
@@ -43,7 +43,8 @@ if __name__ == "__main__":
     args = parser.parse_args()
     player_n = args.player
     assert player_n in [0, 1]
-    agent = Agent(TTT)
-    agent.load(os.path.join(args.load_dir, str(1-player_n)))
+    agent = Agent.from_directory(
+        TTT, os.path.join(args.load_dir, str(1-player_n))
+    )
 
     play(player_n, agent)
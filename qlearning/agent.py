@@ -4,16 +4,31 @@ import os
 import pickle
 import random
 
+from games.symmetry import get_symmetry
 from parameters import LOG_LEVEL
 from utils.log import create_logger
-from .history import History
+from .checkpoint import (
+    delta_paths, load_delta, load_qvalues, remove_deltas, save_array,
+    save_json, save_qvalues,
+)
+from .history import History, PrioritizedHistory
+from .qtable import SparseQValues
+from .shared import SharedQValues
 
 
-QVALUES_FILE = "qvalues.pkl"
+QVALUES_FILE = "qvalues.bin"
+LEGACY_QVALUES_FILE = "qvalues.pkl"
+KEYS_FILE = "keys.npy"
 PARAMS_FILE = "params.json"
 EXTRAS_FILE = "extras.json"
 
 
+def read_params(directory):
+    """Return params of agent saved in directory."""
+    with open(os.path.join(directory, PARAMS_FILE)) as file:
+        return json.load(file)
+
+
 class Agent(object):
     """Agent of QLearing."""
 
@@ -24,54 +39,224 @@ class Agent(object):
         'exploration_rate': 1,
         'exploration_decay': 0.995,
         'exploration_min': 0.01,
+        'memory_size': 10,
+        'replay_batch': 0,
+        'priority_alpha': 0.,
+        'action_mask': 0,
+        'symmetry': 0,
+        'sparse': 0,
+        'episodic': 0,
     }
 
-    def __init__(self, game_cls, params={}):
+    def __init__(self, game_cls, params={}, dtype=np.float64):
         """Create an agent given a game class.
 
         Args:
+            game_cls (cls of games.game.Game)
             params (dict):
                 discount_rate       default is 0.95
                 learning_rate       default is 0.001
                 exploration_rate    default is 1
                 exploration_decay   default is 0.995
                 exploration_min     default is 0.01
+                memory_size         number of experiences kept in history,
+                                    default is 10
+                replay_batch        number of experiences replayed from
+                                    history after each game, default is 0
+                priority_alpha      how much replay favors experiences with
+                                    high errors, default is 0 (uniform)
+                action_mask         whether to only explore and predict
+                                    legal actions, default is 0
+                symmetry            whether symmetric states share their
+                                    qvalues, only at creation, default is 0
+                sparse              if not 0, maximum number of states,
+                                    whose qvalues are allocated on first
+                                    visit, states being integer codes, only
+                                    at creation, not with symmetry nor
+                                    action_mask, default is 0
+                episodic            whether to learn from moves of a game at
+                                    its end rather than after each move,
+                                    default is 0
+            dtype (numpy.dtype): type of qvalues, default is float64
 
         """
 
         self.number = Agent.agents_n
         Agent.agents_n += 1
 
+        self.game_cls = game_cls
         self.states = game_cls.states
         self.actions = game_cls.actions
         self.action_size = len(self.actions)
+        self.legal = None  # Legal actions by state, @see set_legal
 
-        self.qvalues = [
-            [0 for action in self.actions]
-            for state in self.states
-        ]
+        # One row of action values per state, or per canonical state, or
+        # per visited state if sparse
+        self.symmetry = None  # games.symmetry.Symmetry
+        self.table = None  # qlearning.qtable.SparseQValues
+        capacity = params.get('sparse', Agent.params['sparse'])
+        if capacity and params.get('symmetry', Agent.params['symmetry']):
+            raise ValueError("Sparse qvalues cannot be shared by symmetry.")
+        if capacity:
+            self.table = SparseQValues(capacity, self.action_size, dtype)
+            self.qvalues = self.table.values
+        elif self.states is None:
+            raise ValueError(
+                "States of %s are not enumerated, use sparse qvalues."
+                % game_cls.__name__
+            )
+        else:
+            rows_n = len(self.states)
+            if params.get('symmetry', Agent.params['symmetry']):
+                self.symmetry = get_symmetry(game_cls)
+                rows_n = self.symmetry.size
+            self.qvalues = np.zeros(
+                (rows_n, self.action_size), dtype=dtype
+            )
+        self.shared = None  # qlearning.shared.SharedQValues
+        # Rows updated since last checkpoint
+        self.dirty = np.zeros(len(self.qvalues), dtype=bool)
         self.extras = {
             'cumul_reward': 0,
             'updates_n': 0,
         }
-        self.history = History(10)
+        self.game_reward = 0
 
         self.params = dict(Agent.params)
+        self.history = None
         self.set_params(**params)
 
         self.log = create_logger(str(self), log_level=LOG_LEVEL)
         self.log.info("Agent initialized with params: %s.", self.params)
 
+    @classmethod
+    def from_directory(cls, game_cls, directory, dtype=np.float64):
+        """Create agent with params saved in directory, and load it.
+
+        Params only set at creation, as symmetry, are those of the saved
+        agent, @see load.
+        """
+        agent = cls(game_cls, params=read_params(directory), dtype=dtype)
+        agent.load(directory)
+        return agent
+
     def set_extras(self, **extras):
         self.extras.update(extras)
 
     def set_qvalues(self, qvalues):
-        assert len(qvalues) == len(self.qvalues)
-        assert len(qvalues[0]) == len(self.qvalues[0])
+        """Set qvalues from an array or a list of lists (legacy format)."""
+        qvalues = np.ascontiguousarray(qvalues, dtype=self.qvalues.dtype)
+        assert qvalues.shape == self.qvalues.shape
+        if self.shared is None:
+            self.qvalues = qvalues
+        else:
+            self.qvalues[:] = qvalues
+
+    def warm_start(self, qvalues):
+        """Set qvalues from an array of qvalues by state and action.
+
+        With symmetry, qvalues of symmetric states and actions should be the
+        same, as they end up in a same row and column.
+
+        Args:
+            qvalues (numpy.ndarray): e.g. games.solver.Solution.qvalues
+        """
+        qvalues = np.asarray(qvalues, dtype=self.qvalues.dtype)
+        assert qvalues.shape == (len(self.states), self.action_size)
+        if self.table is not None:
+            self.qvalues[self.table.rows(np.arange(len(qvalues)))] = qvalues
+        elif self.symmetry is None:
+            self.qvalues[:] = qvalues
+        else:
+            rows, columns = self.symmetry.row(np.arange(len(self.states)))
+            self.qvalues[rows[:, None], columns] = qvalues
+        self.dirty[:] = True
+
+    def share_qvalues(self, lock_n=0):
+        """Move qvalues to shared memory and return shared qvalues.
+
+        Args:
+            lock_n (int): number of row locks, 0 for lock-free updates
+        """
+        if self.table is not None:
+            raise ValueError("Sparse qvalues cannot be shared.")
+        self.attach_qvalues(SharedQValues.create(self.qvalues, lock_n))
+        return self.shared
+
+    def attach_qvalues(self, shared):
+        """Use shared qvalues (qlearning.shared.SharedQValues)."""
+        assert shared.shape == self.qvalues.shape
+        self.shared = shared
+        self.qvalues = shared.array
+
+    def unshare_qvalues(self):
+        """Copy shared qvalues back to private memory and detach."""
+        qvalues = self.snapshot_qvalues()
+        self.shared.close()
+        self.shared = None
         self.qvalues = qvalues
 
+    def snapshot_qvalues(self):
+        """Return a consistent copy of qvalues if shared, else qvalues.
+
+        Sparse qvalues are only returned up to their last allocated row.
+        """
+        if self.table is not None:
+            return self.qvalues[:len(self.table)]
+        if self.shared is None:
+            return self.qvalues
+        return self.shared.snapshot()
+
     def set_params(self, **params):
+        if bool(params.get('symmetry', self.symmetry is not None)) != (
+            self.symmetry is not None
+        ):
+            raise ValueError("Symmetry can only be set at agent creation.")
+        capacity = self.table.capacity if self.table is not None else 0
+        if params.get('sparse', capacity) != capacity:
+            raise ValueError("Sparse can only be set at agent creation.")
+        if params.get('action_mask') and self.table is not None:
+            raise ValueError("Action mask needs enumerated states.")
         self.params.update(params)
+        self.set_history()
+        if self.params['action_mask'] and self.legal is None:
+            self.set_legal()
+
+    def set_legal(self):
+        """Gather legal actions of states from game legal masks."""
+        masks = self.game_cls.legal_masks()
+        self.legal = (
+            (masks[:, None] >> np.arange(self.action_size)) & 1
+        ).astype(bool)
+        self.legal_actions = [
+            np.flatnonzero(legal).tolist() for legal in self.legal
+        ]
+        # Legal columns by row of qvalues, for the values of next states,
+        # all columns of states without legal actions
+        legal = self.legal | ~self.legal.any(axis=1)[:, None]
+        if self.symmetry is None:
+            self.legal_rows = legal
+        else:
+            self.legal_rows = np.zeros(self.qvalues.shape, dtype=bool)
+            self.legal_rows[
+                self.symmetry.rows[:, None],
+                self.symmetry.action_maps[self.symmetry.transforms],
+            ] = legal
+
+    def set_history(self):
+        """Create history if params do not match current one."""
+        max_size = self.params['memory_size']
+        alpha = self.params['priority_alpha']
+        if (
+            self.history is not None
+            and self.history.max_size == max_size
+            and getattr(self.history, 'alpha', 0) == alpha
+        ):
+            return
+        if alpha:
+            self.history = PrioritizedHistory(max_size, alpha=alpha)
+        else:
+            self.history = History(max_size)
 
     def pick_action(self, state):
         """Return an action given a state.
@@ -79,59 +264,232 @@ class Agent(object):
         Compromise between qvalue and exploration rate.
         """
         if np.random.rand() <= self.params['exploration_rate']:
+            if self.params['action_mask']:
+                actions = self.legal_actions[state]
+                if actions:
+                    return random.choice(actions)
             return random.randrange(self.action_size)
         else:
             return self.predict(state)
 
+    def values(self, state):
+        """Return qvalues of state by action."""
+        if self.table is not None:
+            return self.qvalues[self.table.row(state, insert=False)]
+        if self.symmetry is None:
+            return self.qvalues[state]
+        row, columns = self.symmetry.row(state)
+        return self.qvalues[row, columns]
+
     def predict(self, state):
         """Return best action given the current qvalue."""
-        values = self.qvalues[state]
-        return values.index(max(values))
+        values = self.values(state)
+        if self.params['action_mask']:
+            values = np.where(self.legal[state], values, -np.inf)
+        return int(values.argmax())
+
+    def predict_batch(self, states):
+        """Return array of best actions given an array of states."""
+        states = np.asarray(states)
+        if self.table is not None:
+            values = self.qvalues[self.table.rows(states, insert=False)]
+        elif self.symmetry is None:
+            values = self.qvalues[states]
+        else:
+            rows, columns = self.symmetry.row(states)
+            values = self.qvalues[rows[:, None], columns]
+        if self.params['action_mask']:
+            values = np.where(self.legal[states], values, -np.inf)
+        return values.argmax(axis=1)
 
     def update_params(self):
-        self.extras['cumul_reward'] += self.history.total_reward()
+        """Update agent at the end of a game."""
+        if self.params['replay_batch'] and len(self.history):
+            self.replay(self.params['replay_batch'])
+        self.extras['cumul_reward'] += self.game_reward
         self.extras['updates_n'] += 1
-        self.history.clean()
+        self.game_reward = 0
         self.params['exploration_rate'] = max(
             self.params['exploration_rate'] * self.params['exploration_decay'],
             self.params['exploration_min']
         )
 
     def update_qvalue(self, experience):
-        """Update qvalue given an experience.
+        """Update qvalue given an experience and return the update.
 
         Args:
             experience (qlearning.experience.Experience)
         """
         self.log.debug("Updating qvalue with %s.", experience)
         exp = experience
-        next_action = self.predict(exp.next_state)
-        update = (
-            self.params['learning_rate'] * (
-                exp.reward
-                + (
-                    self.params['discount_rate']
-                    * self.qvalues[exp.next_state][next_action]
+        return self.learn(
+            exp.state, exp.action, exp.reward, exp.next_state, exp.done
+        )
+
+    def learn(self, state, action, reward, next_state, done=False):
+        """Update qvalue given fields of an experience, keep it in history.
+
+        Return the update.
+        """
+        update = self._update_qvalue(state, action, reward, next_state, done)
+        self.game_reward += reward
+        index = self.history.add(state, action, reward, next_state, done)
+        self.history.update_priorities([index], [update])
+        return update
+
+    def update_step(self, trajectory, player_n, next_state):
+        """Learn from last move of player in trajectory, unless episodic.
+
+        Args:
+            trajectory (qlearning.trajectory.Trajectory): moves of game
+            player_n (int): player of agent in trajectory
+            next_state (int): state reached by move
+        """
+        if self.params['episodic']:
+            return
+        state, action, reward = trajectory.last(player_n)
+        self.learn(state, action, reward, next_state)
+
+    def update_trajectory(self, trajectory, player_n, final_state):
+        """Learn from moves of player in trajectory at end of game.
+
+        All moves are learnt at once if episodic (@see update_batch), else
+        only last one, previous ones being learnt by update_step.
+
+        Args:
+            trajectory (qlearning.trajectory.Trajectory): moves of game
+            player_n (int): player of agent in trajectory
+            final_state (int): state at end of game
+        """
+        if not trajectory.lengths[player_n]:
+            return
+        if not self.params['episodic']:
+            state, action, reward = trajectory.last(player_n)
+            self.learn(state, action, reward, final_state, done=True)
+            return
+        columns = trajectory.columns(player_n, final_state)
+        updates = self.update_batch(*columns)
+        self.game_reward += columns[2].sum().item()
+        indexes = self.history.extend(*columns)
+        self.history.update_priorities(indexes, updates[-len(indexes):])
+
+    def update_batch(self, states, actions, rewards, next_states, dones):
+        """Update qvalues given arrays of experiences and return the updates.
+
+        Updates are all computed from qvalues before the batch, then added
+        to them, so that updates of a same state and action add up. A batch
+        of one experience updates qvalues as update_qvalue does, without
+        keeping the experience in history.
+        """
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        rewards = np.asarray(rewards, dtype=self.qvalues.dtype)
+        next_states = np.asarray(next_states)
+        dones = np.asarray(dones, dtype=bool)
+        if self.symmetry is not None:
+            states, columns = self.symmetry.row(states)
+            actions = columns[np.arange(len(actions)), actions]
+            next_states = self.symmetry.rows[next_states]
+        elif self.table is not None:
+            states = self.table.rows(states)
+            next_states = self.table.rows(next_states, insert=False)
+        if self.shared is not None:
+            self.shared.acquire()
+        try:
+            next_values = self.qvalues[next_states]
+            if self.params['action_mask']:
+                next_values = np.where(
+                    self.legal_rows[next_states], next_values, -np.inf
                 )
-                - self.qvalues[exp.state][exp.action]
+            targets = rewards + np.where(
+                dones, 0,
+                self.params['discount_rate'] * next_values.max(axis=1)
             )
-        )
-        self.qvalues[exp.state][exp.action] += update
-        self.history.append(exp)
+            updates = (
+                self.params['learning_rate']
+                * (targets - self.qvalues[states, actions])
+            )
+            np.add.at(self.qvalues, (states, actions), updates)
+            self.dirty[states] = True
+        finally:
+            if self.shared is not None:
+                self.shared.release()
+        return updates
+
+    def replay(self, batch_size):
+        """Update qvalues from experiences sampled in history.
+
+        An experience sampled many times is replayed once.
+        """
+        indexes = np.unique(self.history.sample_indexes(batch_size))
+        updates = self.update_batch(*self.history.columns(indexes))
+        self.history.update_priorities(indexes, updates)
+
+    def _update_qvalue(self, state, action, reward, next_state, done):
+        if self.symmetry is not None:
+            state, columns = self.symmetry.row(state)
+            action = columns[action]
+            next_state = self.symmetry.rows[next_state]
+        elif self.table is not None:
+            state = self.table.row(state)
+            next_state = self.table.row(next_state, insert=False)
+        lock = self.shared and self.shared.lock(state)
+        if lock is not None:
+            lock.acquire()
+        try:
+            target = reward
+            if not done:
+                next_values = self.qvalues[next_state]
+                if self.params['action_mask']:
+                    next_values = next_values[self.legal_rows[next_state]]
+                target += self.params['discount_rate'] * next_values.max()
+            update = (
+                self.params['learning_rate']
+                * (target - self.qvalues[state, action])
+            )
+            self.qvalues[state, action] += update
+            self.dirty[state] = True
+        finally:
+            if lock is not None:
+                lock.release()
+        return update
 
     def load(self, directory):
-        """Load agent from directory."""
-        path = os.path.join(directory, QVALUES_FILE)
-        self.log.info("Loading qvalues at '%s'", path)
-        with open(path, "rb") as file:
-            qvalues = pickle.load(file)
-        self.set_qvalues(qvalues)
+        """Load agent from directory, applying deltas of checkpoints.
 
-        path = os.path.join(directory, PARAMS_FILE)
-        self.log.info("Loading params at '%s'", path)
-        with open(path) as file:
-            params = json.load(file)
-        self.set_params(**params)
+        Qvalues are memory-mapped, copy-on-write, unless saved in the legacy
+        pickle format or sparse. Params only set at creation must match
+        those saved, use from_directory to create agent from them.
+        """
+        self.log.info(
+            "Loading params at '%s'", os.path.join(directory, PARAMS_FILE)
+        )
+        self.set_params(**read_params(directory))
+
+        delta_n = 0
+        path = os.path.join(directory, QVALUES_FILE)
+        if os.path.exists(path):
+            self.log.info("Loading qvalues at '%s'", path)
+            header, qvalues = load_qvalues(path)
+            delta_n = header.get('delta_n', 0)
+            if header['game'] != self.game_cls.__name__:
+                self.log.warning(
+                    "Loading qvalues of %s for %s.",
+                    header['game'], self.game_cls.__name__
+                )
+        else:
+            path = os.path.join(directory, LEGACY_QVALUES_FILE)
+            self.log.info("Loading qvalues at '%s'", path)
+            with open(path, "rb") as file:
+                qvalues = pickle.load(file)
+        if self.table is None:
+            self.set_qvalues(qvalues)
+        else:
+            path = os.path.join(directory, KEYS_FILE)
+            self.log.info("Loading keys of states at '%s'", path)
+            keys = np.load(path)
+            self.table.clear()
+            self.qvalues[self.table.rows(keys)] = qvalues
 
         path = os.path.join(directory, EXTRAS_FILE)
         self.log.info("Loading params at '%s'", path)
@@ -139,26 +497,59 @@ class Agent(object):
             extras = json.load(file)
         self.set_extras(**extras)
 
+        for number, path in delta_paths(directory):
+            if number <= delta_n:
+                continue
+            self.log.info("Applying qvalues delta at '%s'", path)
+            rows, values, params, extras = load_delta(path)
+            if self.table is not None:
+                rows = self.table.rows(rows)  # Rows are keys of states
+            self.qvalues[rows] = values
+            self.set_params(**params)
+            self.set_extras(**extras)
+        self.dirty[:] = False
+
     def save(self, directory):
-        """Save agent to directory."""
+        """Save agent to directory, replacing deltas of checkpoints."""
+        deltas = delta_paths(directory)
+        delta_n = deltas[-1][0] if deltas else 0
+        self.write(
+            directory, self.snapshot_qvalues(), self.params, self.extras,
+            delta_n=delta_n,
+        )
+        remove_deltas(directory, delta_n)
+
+    def write(self, directory, qvalues, params, extras, delta_n=0):
+        """Write qvalues, params and extras of agent to directory.
+
+        Args:
+            directory (str): where to write files
+            qvalues (numpy.ndarray): qvalues of agent
+            params (dict): params of agent
+            extras (dict): extras of agent
+            delta_n (int): number of last delta included in qvalues
+        """
         if directory and not os.path.exists(directory):
             self.log.info("Creating directory '%s'", directory)
-            os.makedirs(directory)
+            os.makedirs(directory, exist_ok=True)
 
         path = os.path.join(directory, QVALUES_FILE)
         self.log.info("Saving qvalues at '%s'", path)
-        with open(path, "wb") as file:
-            pickle.dump(self.qvalues, file)
+        save_qvalues(path, qvalues, self.game_cls.__name__, delta_n=delta_n)
+
+        if self.table is not None:
+            # Keys of rows only get appended, so qvalues rows match them
+            path = os.path.join(directory, KEYS_FILE)
+            self.log.info("Saving keys of states at '%s'", path)
+            save_array(path, self.table.keys[:len(qvalues)])
 
         path = os.path.join(directory, PARAMS_FILE)
         self.log.info("Saving params at '%s'", path)
-        with open(path, "w") as file:
-            json.dump(self.params, file)
+        save_json(path, params)
 
         path = os.path.join(directory, EXTRAS_FILE)
         self.log.info("Saving extras at '%s'", path)
-        with open(path, "w") as file:
-            json.dump(self.extras, file)
+        save_json(path, extras)
 
     def __str__(self):
         return "Agent%s" % self.number
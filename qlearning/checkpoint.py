@@ -0,0 +1,237 @@
+"""Binary qvalues files, readable with mmap, and their deltas.
+
+A qvalues file is made of:
+    MAGIC
+    length of header, 4 bytes little-endian unsigned int
+    JSON header: game, states, actions and dtype of qvalues, number of last
+        delta included, padded with spaces so that qvalues start at a
+        multiple of ALIGNMENT
+    qvalues, raw in C order
+
+A delta file holds qvalues rows updated since previous delta, along with
+params and extras of agent, and is numbered after it. Rows of sparse
+qvalues are given by keys of their states.
+"""
+import json
+import numpy as np
+import os
+import queue
+import re
+import struct
+import threading
+
+
+MAGIC = b"QVALUES\x00"
+ALIGNMENT = 64
+DELTA_FILE = "delta-%06d.npz"
+DELTA_REGEX = re.compile(r"^delta-(\d+)\.npz$")
+
+
+def save_qvalues(path, qvalues, game, delta_n=0):
+    """Write qvalues of game (str) at path, atomically.
+
+    Args:
+        path (str): path to qvalues file
+        qvalues (numpy.ndarray): 2D array of qvalues
+        game (str): name of game class
+        delta_n (int): number of last delta included in qvalues
+    """
+    header = json.dumps({
+        'game': game,
+        'states': qvalues.shape[0],
+        'actions': qvalues.shape[1],
+        'dtype': qvalues.dtype.str,
+        'delta_n': delta_n,
+    }).encode("utf-8")
+    offset = len(MAGIC) + 4 + len(header)
+    header += b" " * (-offset % ALIGNMENT)
+
+    tmp_path = "%s.%s.tmp" % (path, os.getpid())
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<I", len(header)))
+        file.write(header)
+        file.write(np.ascontiguousarray(qvalues).tobytes())
+    os.replace(tmp_path, path)
+
+
+def save_json(path, data):
+    """Write data as JSON at path, atomically."""
+    tmp_path = "%s.%s.tmp" % (path, os.getpid())
+    with open(tmp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def save_array(path, array):
+    """Write numpy array at path, atomically."""
+    tmp_path = "%s.%s.tmp" % (path, os.getpid())
+    with open(tmp_path, "wb") as file:
+        np.save(file, array)
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Return header of qvalues file and offset of qvalues."""
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("'%s' is not a qvalues file" % path)
+        length, = struct.unpack("<I", file.read(4))
+        header = json.loads(file.read(length).decode("utf-8"))
+    return header, len(MAGIC) + 4 + length
+
+
+def load_qvalues(path, mode="c"):
+    """Return header and memory-mapped qvalues of file at path.
+
+    Args:
+        path (str): path to qvalues file
+        mode (str): numpy.memmap mode, default is copy-on-write so that
+            updating qvalues does not modify the file
+    """
+    header, offset = read_header(path)
+    qvalues = np.memmap(
+        path, dtype=np.dtype(header['dtype']), mode=mode, offset=offset,
+        shape=(header['states'], header['actions']),
+    )
+    return header, qvalues
+
+
+# ---- Deltas
+
+def delta_paths(directory):
+    """Return sorted list of (number, path) of delta files in directory."""
+    if not os.path.isdir(directory):
+        return []
+    deltas = []
+    for file_name in os.listdir(directory):
+        match = DELTA_REGEX.match(file_name)
+        if match:
+            deltas.append(
+                (int(match.group(1)), os.path.join(directory, file_name))
+            )
+    return sorted(deltas)
+
+
+def save_delta(path, rows, values, params, extras):
+    """Write delta at path, atomically."""
+    tmp_path = "%s.%s.tmp" % (path, os.getpid())
+    with open(tmp_path, "wb") as file:
+        np.savez(
+            file, rows=rows, values=values,
+            params=np.array(json.dumps(params)),
+            extras=np.array(json.dumps(extras)),
+        )
+    os.replace(tmp_path, path)
+
+
+def load_delta(path):
+    """Return rows, values, params and extras of delta at path."""
+    with np.load(path) as delta:
+        return (
+            delta['rows'],
+            delta['values'],
+            json.loads(str(delta['params'])),
+            json.loads(str(delta['extras'])),
+        )
+
+
+def remove_deltas(directory, delta_n):
+    """Remove deltas of directory numbered up to delta_n."""
+    for number, path in delta_paths(directory):
+        if number <= delta_n:
+            os.remove(path)
+
+
+class Checkpointer(object):
+    """Write periodic checkpoints of an agent from a background thread.
+
+    First checkpoint saves the whole agent, next ones only write the qvalues
+    rows updated since the previous checkpoint, tracked by agent.dirty, to
+    a new delta file. Agent.load rebuilds the agent from both.
+
+    A failed write is logged, and next checkpoint saves the whole agent
+    again, as rows of a failed delta are no longer dirty. Its error is
+    raised by next call to wait or close.
+    """
+
+    def __init__(self, agent, directory):
+        """Create a checkpointer of agent (qlearning.agent.Agent)."""
+        self.agent = agent
+        self.directory = directory
+        deltas = delta_paths(directory)
+        self.delta_n = deltas[-1][0] if deltas else 0
+        self.based = False
+        self.error = None  # First error of writes, until raised
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def checkpoint(self):
+        """Snapshot agent and queue writing of its checkpoint."""
+        agent = self.agent
+        params = dict(agent.params)
+        extras = dict(agent.extras)
+        if agent.shared is not None:
+            # Updates of other processes are not tracked
+            agent.dirty[:] = True
+        rows = np.flatnonzero(agent.dirty)
+        agent.dirty[rows] = False
+        if not self.based:
+            self.based = True
+            rows = None
+            values = agent.snapshot_qvalues().copy()
+        else:
+            self.delta_n += 1
+            if agent.shared is None:
+                values = agent.qvalues[rows]
+            else:
+                values = agent.snapshot_qvalues()[rows]
+            if agent.table is not None:
+                rows = agent.table.keys[rows]
+        self.queue.put((self.delta_n, rows, values, params, extras))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self.write(*item)
+            except Exception as error:
+                self.agent.log.exception("Checkpoint %s failed.", item[0])
+                self.based = False
+                if self.error is None:
+                    self.error = error
+            finally:
+                self.queue.task_done()
+
+    def write(self, delta_n, rows, values, params, extras):
+        """Write whole agent if rows is None, else delta numbered delta_n."""
+        if rows is None:
+            self.agent.write(
+                self.directory, values, params, extras, delta_n=delta_n
+            )
+            remove_deltas(self.directory, delta_n)
+        else:
+            path = os.path.join(self.directory, DELTA_FILE % delta_n)
+            self.agent.log.info("Saving qvalues delta at '%s'", path)
+            save_delta(path, rows, values, params, extras)
+
+    def wait(self):
+        """Wait for queued checkpoints to be written, raise if one failed."""
+        self.queue.join()
+        self.raise_error()
+
+    def close(self):
+        """Write queued checkpoints and stop thread, raise if one failed."""
+        self.queue.put(None)
+        self.thread.join()
+        self.raise_error()
+
+    def raise_error(self):
+        """Raise first error of writes since last raised, if any."""
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
@@ -1,5 +1,7 @@
 
-from games.exceptions import GameOver, InvalidPlay, InvalidPlayer
+import numpy as np
+
+from games.game import INVALID_PLAY, PLAYED, STATUSES, TIE, WON
 
 from utils.log import create_logger
 from parameters import LOG_LEVEL
@@ -33,6 +35,7 @@ class Environment(object):
         )
         self.game_cls = game_cls
         self.game = game_cls()
+        self.step_rewards = self.build_step_rewards()
 
     def state(self):
         """Return current state of game."""
@@ -43,34 +46,149 @@ class Environment(object):
 
         Ignore InvalidPlayer and GameOver cases (returns 0 rewards)
         """
-        rewards = {
-            player.number: 0
-            for player in self.game.players
-        }
-
-        try:
-            self.game.act(action_n, player_n)
-        except InvalidPlay:
-            rewards[player_n] = self.rewards['invalid']
-            return rewards
-        except GameOver:
-            return rewards
-        except InvalidPlayer:
-            return rewards
-
-        # Update rewards
-        rewards[player_n] = self.rewards['neutral']
-        for player in self.game.players:
-            if not self.game.is_over():
-                pass
-            elif self.game.winner is None:  # Tie game
-                rewards[player.number] = self.rewards['tie']
-            elif self.game.winner.number is player.number:
-                rewards[player.number] = self.rewards['win']
-            else:
-                rewards[player.number] = self.rewards['lose']
-        return rewards
+        rewards = self.step(action_n, player_n)[1]
+        return {0: rewards[0], 1: rewards[1]}
+
+    def step(self, action_n, player_n):
+        """Play action for player, return status and rewards of players.
+
+        Unlike act, no exception is raised nor dictionary built: rewards are
+        a tuple shared by steps of same status and player, built once from
+        rewards given at creation.
+
+        Returns:
+            (tuple): status of step (@see games.game.Game.step), and tuple
+                of rewards of players 0 and 1
+        """
+        status = self.game.step(action_n, player_n)
+        return status, self.step_rewards[status][player_n]
+
+    def build_step_rewards(self):
+        """Return rewards of players by status of step and player."""
+        step_rewards = []
+        for status in STATUSES:
+            by_player = []
+            for player_n in [0, 1]:
+                rewards = [0, 0]
+                if status == PLAYED:
+                    rewards[player_n] = self.rewards['neutral']
+                elif status == WON:
+                    rewards[player_n] = self.rewards['win']
+                    rewards[1 - player_n] = self.rewards['lose']
+                elif status == TIE:
+                    rewards = [self.rewards['tie'], self.rewards['tie']]
+                elif status == INVALID_PLAY:
+                    rewards[player_n] = self.rewards['invalid']
+                by_player.append(tuple(rewards))
+            step_rewards.append(by_player)
+        return step_rewards
 
     def reset(self):
-        """Restart game."""
-        self.game = self.game_cls()
+        """Restart game, in place."""
+        self.game.reset()
+
+
+class VecEnvironment(object):
+    """Environment playing n games in lockstep.
+
+    Boards are stored in a (n, cells) array holding -1 for empty cells and
+    the number of the player otherwise. Games are reset as soon as they
+    are over.
+
+    Game class must define lines (cells of winning lines) and code_indexes
+    (@see games.tictactoe.TTT).
+    """
+
+    def __init__(self, game_cls, n, rewards=None):
+        """Create an environment of n games given a game class.
+
+        Args:
+            game_cls (cls of games.game.Game)
+            n (int): number of games
+            rewards (dict): @see Environment.rewards
+        """
+        self.log = create_logger(self.__class__.__name__, LOG_LEVEL)
+        self.rewards = dict(Environment.rewards)
+        if rewards:
+            self.rewards.update(rewards)
+        self.log.info(
+            "Playing %s %s games with %s."
+            % (n, game_cls.__name__, self.rewards)
+        )
+        self.game_cls = game_cls
+        self.n = n
+
+        self.cells = np.array(game_cls.actions)
+        self.lines = np.array(game_cls.lines)
+        self.code_indexes = game_cls.code_indexes()
+        self.powers = 3 ** np.arange(len(self.cells))
+
+        self.boards = np.full((n, len(self.cells)), -1, dtype=np.int8)
+        self.player_n = np.zeros(n, dtype=np.int64)
+        # Games over after last act and their state before reset
+        self.dones = np.zeros(n, dtype=bool)
+        self.next_states = self.state()
+
+    def state(self):
+        """Return array of current state indexes."""
+        return self.code_indexes[(self.boards + 1) @ self.powers]
+
+    def act(self, actions, players=None):
+        """Play actions and return (n, 2) array of player rewards.
+
+        Games over are reset, their last state is stored in next_states
+        and they are flagged in dones.
+
+        Args:
+            actions (array of int): action of each game
+            players (array of int, optional): player of each game, default
+                is the expected one. Ignore games with unexpected player
+                (0 rewards).
+        """
+        actions = np.asarray(actions)
+        rewards = np.zeros((self.n, 2))
+        games = np.arange(self.n)
+        if players is None:
+            players = self.player_n.copy()
+        else:
+            players = np.asarray(players)
+
+        cells = self.cells[actions]
+        expected = players == self.player_n
+        free = self.boards[games, cells] < 0
+
+        # Invalid plays
+        invalid = games[expected & ~free]
+        rewards[invalid, players[invalid]] = self.rewards['invalid']
+
+        # Play
+        played = games[expected & free]
+        movers = players[played]
+        self.boards[played, cells[played]] = movers
+        self.player_n[played] = 1 - movers
+        rewards[played, movers] = self.rewards['neutral']
+
+        # Update rewards of games over
+        boards = self.boards[played]
+        won = (
+            boards[:, self.lines] == movers[:, None, None]
+        ).all(axis=2).any(axis=1)
+        tie = ~won & (boards >= 0).all(axis=1)
+        winners = played[won]
+        rewards[winners, movers[won]] = self.rewards['win']
+        rewards[winners, 1 - movers[won]] = self.rewards['lose']
+        rewards[played[tie]] = self.rewards['tie']
+
+        self.dones[:] = False
+        self.dones[winners] = True
+        self.dones[played[tie]] = True
+        self.next_states = self.state()
+        self.reset(self.dones)
+        return rewards
+
+    def reset(self, games=None):
+        """Restart all games, or games selected by a mask or indexes."""
+        if games is None:
+            games = slice(None)
+        self.boards[games] = -1
+        self.player_n[games] = 0
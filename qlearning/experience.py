@@ -1,14 +1,16 @@
 class Experience(object):
     """An experience in learning process."""
 
-    def __init__(self, state, action, reward, next_state):
+    __slots__ = ['state', 'action', 'reward', 'next_state', 'done']
+
+    def __init__(self, state, action, reward, next_state, done=False):
         self.state = state
         self.action = action
         self.reward = reward
         self.next_state = next_state
+        self.done = done
 
     def __str__(self):
-        return (
-            "{state}--{action}-->{next_state}[{reward}]"
-            .format(**self.__dict__)
+        return "%s--%s-->%s[%s]" % (
+            self.state, self.action, self.next_state, self.reward
         )
@@ -1,22 +1,174 @@
+import numpy as np
+
+from .experience import Experience
+from .sumtree import SumTree
+
+
 class History(object):
-    """History of experiences."""
+    """History of experiences.
+
+    Ring buffer keeping the last max_size experiences, stored by column in
+    arrays.
+    """
 
     def __init__(self, max_size):
-        self.experiences = []
         self.max_size = max_size
+        self.states = np.zeros(max_size, dtype=np.int64)
+        self.actions = np.zeros(max_size, dtype=np.int64)
+        self.rewards = np.zeros(max_size, dtype=np.float64)
+        self.next_states = np.zeros(max_size, dtype=np.int64)
+        self.dones = np.zeros(max_size, dtype=bool)
+        self.size = 0
+        self.position = 0  # Where next experience goes
 
     def append(self, experience):
-        self.experiences = self.experiences[:self.max_size - 1]
-        self.experiences.append(experience)
+        """Append experience and return its index."""
+        exp = experience
+        return self.add(
+            exp.state, exp.action, exp.reward, exp.next_state, exp.done
+        )
+
+    def add(self, state, action, reward, next_state, done=False):
+        """Append experience given by its fields and return its index."""
+        position = self.position
+        self.states[position] = state
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.next_states[position] = next_state
+        self.dones[position] = done
+        self.position = (position + 1) % self.max_size
+        if self.size < self.max_size:
+            self.size += 1
+        return position
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """Append experiences given as column arrays, return their indexes.
+
+        Only the last max_size experiences are kept if there are more.
+        """
+        columns = [
+            np.asarray(column)[-self.max_size:]
+            for column in [states, actions, rewards, next_states, dones]
+        ]
+        indexes = (self.position + np.arange(len(columns[0]))) % self.max_size
+        for array, column in zip(
+            [
+                self.states, self.actions, self.rewards, self.next_states,
+                self.dones,
+            ],
+            columns,
+        ):
+            array[indexes] = column
+        self.position = (self.position + len(indexes)) % self.max_size
+        self.size = min(self.size + len(indexes), self.max_size)
+        return indexes
 
     def clean(self):
-        self.experiences = []
+        self.size = 0
+        self.position = 0
+
+    def experience(self, index):
+        """Return experience stored at index of arrays."""
+        return Experience(
+            state=int(self.states[index]),
+            action=int(self.actions[index]),
+            reward=self.rewards[index].item(),
+            next_state=int(self.next_states[index]),
+            done=bool(self.dones[index]),
+        )
 
     def last(self):
-        return self.experiences[-1]
+        if not self.size:
+            raise IndexError("History is empty")
+        return self.experience(self.position - 1)
 
     def total_reward(self):
-        return sum(map(lambda exp: exp.reward, self.experiences))
+        return self.rewards[:self.size].sum().item()
+
+    def sample(self, batch_size, random_state=np.random):
+        """Return sampled experiences as column arrays.
+
+        Returns:
+            (tuple): states, actions, rewards, next_states, dones
+        """
+        return self.columns(self.sample_indexes(batch_size, random_state))
+
+    def sample_indexes(self, batch_size, random_state=np.random):
+        """Return array of uniformly sampled indexes."""
+        return random_state.randint(self.size, size=batch_size)
+
+    def update_priorities(self, indexes, errors):
+        """Update priorities of experiences given their errors.
+
+        Experiences are sampled uniformly, so there is nothing to do.
+        """
+        pass
+
+    def columns(self, indexes):
+        """Return experiences at indexes as column arrays.
+
+        Returns:
+            (tuple): states, actions, rewards, next_states, dones
+        """
+        return (
+            self.states[indexes],
+            self.actions[indexes],
+            self.rewards[indexes],
+            self.next_states[indexes],
+            self.dones[indexes],
+        )
 
     def __iter__(self):
-        return self.experiences.__iter__()
+        start = self.position - self.size
+        for index in range(start, self.position):
+            yield self.experience(index)
+
+    def __len__(self):
+        return self.size
+
+
+class PrioritizedHistory(History):
+    """History sampling experiences in proportion to their error.
+
+    Priority of an experience is (|error| + epsilon) ** alpha, new
+    experiences getting the highest priority seen so far.
+    """
+
+    def __init__(self, max_size, alpha=0.6, epsilon=0.01):
+        super().__init__(max_size)
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.tree = SumTree(max_size)
+        self.max_priority = 1.
+
+    def add(self, state, action, reward, next_state, done=False):
+        """Append experience given by its fields and return its index."""
+        position = super().add(state, action, reward, next_state, done)
+        self.tree.update(position, self.max_priority)
+        return position
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """Append experiences given as column arrays, return their indexes.
+
+        Only the last max_size experiences are kept if there are more.
+        """
+        indexes = super().extend(states, actions, rewards, next_states, dones)
+        for index in indexes.tolist():
+            self.tree.update(index, self.max_priority)
+        return indexes
+
+    def clean(self):
+        super().clean()
+        self.tree.clean()
+        self.max_priority = 1.
+
+    def sample_indexes(self, batch_size, random_state=np.random):
+        """Return array of indexes sampled in proportion to priorities."""
+        return self.tree.sample(batch_size, random_state)
+
+    def update_priorities(self, indexes, errors):
+        """Update priorities of experiences given their errors."""
+        priorities = (np.abs(errors) + self.epsilon) ** self.alpha
+        for index, priority in zip(indexes, priorities):
+            self.tree.update(index, priority)
+        self.max_priority = max(self.max_priority, priorities.max())
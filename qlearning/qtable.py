@@ -0,0 +1,109 @@
+"""Sparse qvalues, allocated on first visit of states."""
+import numpy as np
+
+
+EMPTY = 0  # Empty slots, slots holding keys plus one
+MULTIPLIER = 0x9E3779B97F4A7C15  # Fibonacci hashing of 64 bits keys
+MASK_64 = (1 << 64) - 1
+
+
+class SparseQValues(object):
+    """Rows of qvalues allocated on first visit of states.
+
+    States are keyed by non-negative integer codes, looked up in an open
+    addressing hash table, with linear probing, made of numpy arrays. Rows
+    are allocated in order of first visit among capacity rows, created with
+    numpy.zeros so that most systems only back visited rows with memory.
+    Memory is thus bounded by capacity, slots of the hash table taking 32
+    bytes per row of capacity.
+
+    Missing states are found at row -1, an extra row kept at zeros, so that
+    their qvalues can be read like others.
+
+    Attributes:
+        values (numpy.ndarray): qvalues by row, with an extra last row
+        keys (numpy.ndarray): state key by row
+        size (int): number of rows allocated
+    """
+
+    def __init__(self, capacity, action_size, dtype=np.float64):
+        """Create empty sparse qvalues.
+
+        Args:
+            capacity (int): maximum number of rows
+            action_size (int): number of actions
+            dtype (numpy.dtype): type of qvalues
+        """
+        self.capacity = capacity
+        bits = max((2 * capacity - 1).bit_length(), 1)  # Load factor <= 1/2
+        self.shift = 64 - bits
+        self.mask = (1 << bits) - 1
+        # Key plus one and row of each slot, side by side to share pages
+        self.slots = np.zeros((1 << bits, 2), dtype=np.int64)
+        self.values = np.zeros((capacity + 1, action_size), dtype=dtype)
+        self.keys = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+
+    def slot(self, key):
+        """Return first slot probed for key."""
+        return ((key * MULTIPLIER) & MASK_64) >> self.shift
+
+    def row(self, key, insert=True):
+        """Return row of state key, -1 if missing and not insert."""
+        key = int(key)
+        slot = self.slot(key)
+        slots = self.slots
+        while True:
+            found, row = slots[slot].tolist()
+            if found == key + 1:
+                return row
+            if found == EMPTY:
+                break
+            slot = (slot + 1) & self.mask
+        if not insert:
+            return -1
+
+        if self.size == self.capacity:
+            raise ValueError(
+                "Sparse qvalues are full, capacity is %s." % self.capacity
+            )
+        row = self.size
+        self.size += 1
+        slots[slot] = key + 1, row
+        self.keys[row] = key
+        return row
+
+    def rows(self, keys, insert=True):
+        """Return array of rows of state keys, @see row."""
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1)
+        slots = (
+            (keys.astype(np.uint64) * np.uint64(MULTIPLIER))
+            >> np.uint64(self.shift)
+        ).astype(np.int64)
+        rows = np.full(len(keys), -1, dtype=np.int64)
+
+        # Probe all keys at once, until found or reaching an empty slot
+        pending = np.arange(len(keys))
+        missing = []
+        while len(pending):
+            found = self.slots[slots[pending]]
+            hit = found[:, 0] == keys[pending] + 1
+            rows[pending[hit]] = found[hit, 1]
+            empty = found[:, 0] == EMPTY
+            missing.extend(pending[empty].tolist())
+            pending = pending[~hit & ~empty]
+            slots[pending] = (slots[pending] + 1) & self.mask
+
+        if insert:
+            # One by one, as a key may be missing more than once
+            for index in missing:
+                rows[index] = self.row(keys[index])
+        return rows
+
+    def clear(self):
+        self.slots[:] = EMPTY
+        self.values[:self.size] = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
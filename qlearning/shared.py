@@ -0,0 +1,85 @@
+import numpy as np
+from multiprocessing import Lock, shared_memory
+
+
+class SharedQValues(object):
+    """Qvalues living in a shared memory block.
+
+    Processes attach to the block without copying it and update it in
+    place, either without locking (Hogwild) or holding the lock of updated
+    rows. Rows share a fixed number of locks, row n using lock n % lock_n.
+
+    Locks can only be sent to processes when they are created, so pass
+    shared qvalues as Process or Pool initializer arguments.
+    """
+
+    def __init__(self, shape, dtype=np.float64, name=None, locks=None):
+        """Create a shared memory block, or attach to it given its name.
+
+        Args:
+            shape (tuple): shape of qvalues
+            dtype (numpy.dtype): type of qvalues
+            name (str, optional): name of block to attach to
+            locks (list of multiprocessing.Lock, optional): row locks
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.locks = locks
+        self.owner = name is None
+        if self.owner:
+            size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, self.dtype, buffer=self.memory.buf)
+
+    @classmethod
+    def create(cls, qvalues, lock_n=0):
+        """Return shared copy of qvalues, with lock_n row locks."""
+        locks = [Lock() for lock_i in range(lock_n)] or None
+        shared = cls(qvalues.shape, qvalues.dtype, locks=locks)
+        shared.array[:] = qvalues
+        return shared
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def lock(self, row):
+        """Return lock of row, None if not locking."""
+        if self.locks is None:
+            return None
+        return self.locks[row % len(self.locks)]
+
+    def acquire(self):
+        """Hold all locks, in order, if locking."""
+        for lock in self.locks or []:
+            lock.acquire()
+
+    def release(self):
+        for lock in self.locks or []:
+            lock.release()
+
+    def snapshot(self):
+        """Return a private copy of qvalues.
+
+        When locking, all locks are held so that no row is half updated.
+        """
+        self.acquire()
+        try:
+            return self.array.copy()
+        finally:
+            self.release()
+
+    def close(self):
+        """Detach from block, and free it if owner."""
+        self.array = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.shape, self.dtype.str, self.memory.name, self.locks),
+        )
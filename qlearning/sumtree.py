@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class SumTree(object):
+    """Binary tree of priorities where each node is the sum of its children.
+
+    Nodes are stored in an array, node n having children 2n+1 and 2n+2, and
+    the last capacity nodes being the leaves.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.nodes = np.zeros(2 * capacity - 1)
+
+    def total(self):
+        """Return sum of priorities."""
+        return self.nodes[0]
+
+    def get(self, index):
+        """Return priority at index."""
+        return self.nodes[index + self.capacity - 1]
+
+    def update(self, index, priority):
+        """Set priority at index."""
+        node = index + self.capacity - 1
+        change = priority - self.nodes[node]
+        self.nodes[node] = priority
+        while node:
+            node = (node - 1) // 2
+            self.nodes[node] += change
+
+    def find(self, value):
+        """Return index of leaf where cumulated priorities reach value."""
+        node = 0
+        leaf = self.capacity - 1
+        while node < leaf:
+            left = 2 * node + 1
+            if value < self.nodes[left] or not self.nodes[left + 1]:
+                node = left
+            else:
+                value -= self.nodes[left]
+                node = left + 1
+        return node - leaf
+
+    def sample(self, batch_size, random_state=np.random):
+        """Return array of indexes sampled in proportion to priorities."""
+        values = random_state.uniform(0, self.total(), size=batch_size)
+        return np.array([self.find(value) for value in values], dtype=int)
+
+    def clean(self):
+        self.nodes[:] = 0
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class Trajectory(object):
+    """Moves of the 2 players of a game, in lists reused from game to game.
+
+    Moves are stored in preallocated lists by player, rather than numpy
+    arrays whose item accesses are slower, lists doubling their length when
+    a player plays more moves than they can hold.
+
+    Attributes:
+        states (list of list): state of each move, by player
+        actions (list of list): action of each move, by player
+        rewards (list of list): rewards got by player after each move, up
+            to their next move
+        lengths (list of int): number of moves of each player
+    """
+
+    def __init__(self, max_length=16):
+        self.states = [[0] * max_length, [0] * max_length]
+        self.actions = [[0] * max_length, [0] * max_length]
+        self.rewards = [[0] * max_length, [0] * max_length]
+        self.lengths = [0, 0]
+
+    def clear(self):
+        self.lengths[0] = self.lengths[1] = 0
+
+    def record(self, player_n, state, action, reward):
+        """Record move of player and its reward."""
+        length = self.lengths[player_n]
+        states = self.states[player_n]
+        if length == len(states):
+            self.grow(player_n)
+            states = self.states[player_n]
+        states[length] = state
+        self.actions[player_n][length] = action
+        self.rewards[player_n][length] = reward
+        self.lengths[player_n] = length + 1
+
+    def reward(self, player_n, reward):
+        """Add reward to last move of player, if any."""
+        length = self.lengths[player_n]
+        if length:
+            self.rewards[player_n][length - 1] += reward
+
+    def grow(self, player_n):
+        """Double length of lists of player."""
+        for lists in [self.states, self.actions, self.rewards]:
+            lists[player_n] = lists[player_n] + [0] * len(lists[player_n])
+
+    def last(self, player_n):
+        """Return state, action and reward of last move of player."""
+        index = self.lengths[player_n] - 1
+        if index < 0:
+            raise IndexError("Player %s did not play" % player_n)
+        return (
+            self.states[player_n][index],
+            self.actions[player_n][index],
+            self.rewards[player_n][index],
+        )
+
+    def columns(self, player_n, final_state):
+        """Return experiences of moves of player as column arrays.
+
+        Next state of a move is state of next move of player, and
+        final_state for last move, which is done.
+
+        Returns:
+            (tuple): states, actions, rewards, next_states, dones
+        """
+        length = self.lengths[player_n]
+        states = self.states[player_n][:length]
+        dones = np.zeros(length, dtype=bool)
+        dones[-1:] = True
+        return (
+            np.array(states, dtype=np.int64),
+            np.array(self.actions[player_n][:length], dtype=np.int64),
+            np.array(self.rewards[player_n][:length], dtype=np.float64),
+            np.array(states[1:] + [final_state], dtype=np.int64),
+            dones,
+        )
@@ -0,0 +1,72 @@
+"""Report of training metrics streamed by main.py.
+
+Plot downsampled curves of metrics of a training, without training again:
+
+    python report.py results/<date>
+"""
+import os
+
+from utils.metrics import read_metrics
+
+
+METRICS_FILE = "metrics.csv"
+
+
+def group_fields(fields):
+    """Return fields of curves by plot, as a dictionary.
+
+    Fields are plotted against the first one, and fields sharing a prefix
+    before their last underscore, e.g. reward_0 and reward_1, are plotted
+    together.
+    """
+    groups = {}
+    for field in fields[1:]:
+        groups.setdefault(field.rsplit("_", 1)[0], []).append(field)
+    return groups
+
+
+def report(path, points=1000, output=None):
+    """Plot metrics of a training.
+
+    Args:
+        path (str): metrics file, or directory of a training
+        points (int): maximum number of points of curves
+        output (str): if not None, path prefix of image files to save plots
+            to, plots are displayed otherwise
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, METRICS_FILE)
+    fields, records = read_metrics(path, points=points)
+
+    import matplotlib.pyplot as plt
+    for name, group in group_fields(fields).items():
+        for field in group:
+            plt.plot(
+                records[:, 0], records[:, fields.index(field)], label=field
+            )
+        plt.xlabel(fields[0])
+        plt.legend()
+        if output:
+            plt.savefig("%s_%s.png" % (output, name))
+            plt.close()
+        else:
+            plt.show()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser("Plot metrics of a training.")
+    parser.add_argument(
+        "path", type=str,
+        help="Metrics file, or directory of a training."
+    )
+    parser.add_argument(
+        "-p", "--points", type=int, required=False, default=1000,
+        help="Maximum number of points of curves, default is 1000."
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, required=False, default=None,
+        help="Path prefix of images to save plots to, displayed otherwise."
+    )
+    args = parser.parse_args()
+    report(args.path, points=args.points, output=args.output)
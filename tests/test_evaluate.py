@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from evaluate import OUTCOMES, evaluate, get_policy, play_games, rates
+
+
+def test_play_games():
+    policies = {0: get_policy("optimal", 0), 1: get_policy("optimal", 1)}
+    counts = play_games(policies, 20)
+    assert counts[OUTCOMES.index("tie")] == 20
+
+    # Always playing the first cell is invalid on second move
+    policies = {0: get_policy("random", 0), 1: lambda state: 0}
+    counts = play_games(policies, 20)
+    assert counts.sum() == 20
+    assert counts[OUTCOMES.index("invalid_1")] > 0
+
+
+def test_evaluate():
+    matches = [("random", "optimal"), ("optimal", "random")]
+    counts = evaluate(matches, 50, seed=0)
+    assert counts.shape == (2, len(OUTCOMES))
+    assert list(counts.sum(axis=1)) == [50, 50]
+    assert np.array_equal(counts, evaluate(matches, 50, seed=0))
+    assert rates(counts[0], 1)['loss'] == 0
+    assert rates(counts[1], 0)['loss'] == 0
+    assert rates(counts[1], 0)['win'] > 0.5
+
+    with pytest.raises(ValueError):
+        evaluate(matches, 0)
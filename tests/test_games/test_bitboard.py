@@ -0,0 +1,84 @@
+import pytest
+import random
+
+from games.bitboard import BitTTT
+from games.exceptions import GameOver, InvalidPlay, InvalidPlayer
+from games.tictactoe import TTT
+
+
+def act(game, action_n, player_n):
+    try:
+        game.act(action_n, player_n)
+    except (GameOver, InvalidPlay, InvalidPlayer) as exc:
+        return exc.__class__
+
+
+def test_BitTTT():
+    game = BitTTT()
+    states = BitTTT.states
+    assert states is TTT.states
+    assert states[game.state()] == (-1, -1, -1, -1, -1, -1, -1, -1, -1)
+
+    with pytest.raises(InvalidPlayer):
+        game.act(0, 1)
+
+    game.act(0, 0)
+    game.act(1, 1)
+    game.act(3, 0)
+
+    with pytest.raises(InvalidPlay):
+        game.act(0, 1)
+
+    game.act(2, 1)
+    game.act(6, 0)
+
+    with pytest.raises(GameOver):
+        game.act(4, 1)
+
+    assert states[game.state()] == (0, 1, 1, 0, -1, -1, 0, -1, -1)
+    assert game.winner.number == 0
+    assert game.string() == (
+        " X | O | O \n"
+        "---+---+---\n"
+        " X |   |   \n"
+        "---+---+---\n"
+        " X |   |   "
+    )
+
+
+def test_BitTTT_same_as_TTT():
+    random.seed(0)
+    for game_n in range(200):
+        game, bit_game = TTT(), BitTTT()
+        while not game.is_over():
+            action_n = random.randrange(9)
+            player_n = random.choice([game.player_n] * 3 + [1 - game.player_n])
+            assert act(game, action_n, player_n) is act(
+                bit_game, action_n, player_n
+            )
+            assert game.state() == bit_game.state()
+            assert game.is_over() == bit_game.is_over()
+            assert game.string() == bit_game.string()
+        if game.winner is None:
+            assert bit_game.winner is None
+        else:
+            assert game.winner.number == bit_game.winner.number
+
+
+def test_BitTTT_reset():
+    game = BitTTT()
+    game.act(4, 0)
+    game.reset()
+    assert game.state() == BitTTT().state()
+    assert game.player_n == 0
+    game.act(4, 0)
+
+
+def test_BitTTT_legal_mask():
+    game, bit_game = TTT(), BitTTT()
+    for action_n, player_n in [(0, 0), (4, 1), (8, 0)]:
+        game.act(action_n, player_n)
+        bit_game.act(action_n, player_n)
+        assert bit_game.legal_mask() == game.legal_mask()
+    assert list(BitTTT.legal_masks()) == list(TTT.legal_masks())
+
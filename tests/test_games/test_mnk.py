@@ -0,0 +1,75 @@
+import pytest
+
+from games.exceptions import InvalidPlay
+from games.mnk import ConnectFour, MNK4x4k3, MNK5x5k4, mnk_game, mnk_lines
+from games.tictactoe import TTT
+
+
+def play(game, actions):
+    for action_n in actions:
+        game.act(action_n, game.player_n)
+    return game
+
+
+def test_mnk_lines():
+    assert sorted(mnk_lines(3, 3, 3)) == sorted(TTT.lines)
+    assert len(mnk_lines(4, 4, 3)) == 2 * 8 + 2 * 4
+    assert len(mnk_lines(7, 6, 4)) == 69
+
+
+def test_mnk_game():
+    assert mnk_game(4, 4, 3) is MNK4x4k3
+    assert MNK4x4k3.__name__ == "MNK4x4k3"
+    assert len(MNK5x5k4.actions) == 25
+    assert ConnectFour.actions == list(range(7))
+    with pytest.raises(ValueError):
+        mnk_game(8, 8, 5)
+
+
+def test_MNK():
+    game = play(MNK4x4k3(), [5, 0, 10, 1])
+    assert not game.is_over()
+    with pytest.raises(InvalidPlay):
+        game.act(5, 0)
+    play(game, [15])  # Diagonal 5, 10, 15
+    assert game.is_over()
+    assert game.winner.number == 0
+
+    # Codes of states are unique, whatever the order of moves
+    codes = {}
+    for moves in [[0, 1, 2], [2, 1, 0], [0, 2, 1], [5, 6, 7]]:
+        state = play(MNK5x5k4(), moves).state()
+        codes.setdefault(state, set()).add(frozenset(moves[::2]))
+    assert len(codes) == 3
+    assert all(len(boards) == 1 for boards in codes.values())
+
+    game.reset()
+    assert game.state() == MNK4x4k3().state() == 0
+    assert game.legal_mask() == 2 ** 16 - 1
+
+
+def test_MNK_gravity():
+    game = ConnectFour()
+    play(game, [3, 3, 3, 3, 3, 3])
+    assert game.legal_mask() == 0b1110111
+    with pytest.raises(InvalidPlay):
+        game.act(3, 0)
+    assert game.string().splitlines()[0] == (
+        "   |   |   | O |   |   |   "
+    )
+
+    codes = {ConnectFour().state()}
+    for moves in [[0, 1], [1, 0], [0, 0], [1, 1], [0, 1, 1, 0]]:
+        codes.add(play(ConnectFour(), moves).state())
+    assert len(codes) == 6
+    assert max(codes) < 2 ** 63
+
+    game = play(ConnectFour(), [0, 1, 0, 1, 0, 1, 0])
+    assert game.is_over()
+    assert game.winner.number == 0
+
+
+def test_MNK_pickle():
+    import pickle
+    for game_cls in [MNK4x4k3, ConnectFour]:
+        assert pickle.loads(pickle.dumps(game_cls)) is game_cls
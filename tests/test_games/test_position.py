@@ -14,3 +14,6 @@ def test_Position():
     assert Position(8) == Position(2, 2)
 
     assert str(Position(3)) == "Position(0, 1)"
+
+    assert Position(6, width=4) == Position(2, 1)
+    assert Position(Position(6, width=5)) == Position(1, 1)
@@ -0,0 +1,64 @@
+import numpy as np
+
+from games.solver import ILLEGAL, LOSS, TIE, WIN, OptimalPlayer, get_solution
+from games.tictactoe import TTT
+from main import play_game
+from qlearning.agent import Agent
+from qlearning.environment import Environment
+
+
+def state(*moves):
+    game = TTT()
+    for cell_n in moves:
+        game.act(cell_n, game.player_n)
+    return game.state()
+
+
+def test_Solution():
+    solution = get_solution(TTT)
+    assert solution is get_solution(TTT)
+    assert solution.values.dtype == np.int8
+
+    # Perfect play ties, and answering a center with an edge loses
+    assert solution.values[state()] == TIE
+    assert sorted(solution.best_actions(state(4))) == [0, 2, 6, 8]
+    assert solution.action_values[state(4), 1] == LOSS
+    assert solution.values[state(4, 1)] == WIN
+
+    # Winning in one move, taken cells are illegal
+    assert solution.best_actions(state(0, 3, 1, 4)) == [2]
+    assert solution.action_values[state(0, 3, 1, 4), 0] == ILLEGAL
+
+    # Ended games
+    assert solution.values[state(0, 3, 1, 4, 2)] == LOSS
+    assert not solution.is_playable()[state(0, 3, 1, 4, 2)]
+
+
+def test_Solution_qvalues():
+    solution = get_solution(TTT)
+    rewards = {'win': 10, 'tie': 3, 'lose': -10, 'invalid': -20}
+    qvalues = solution.qvalues(rewards)
+    assert qvalues[state(0, 3, 1, 4), 2] == 10
+    assert qvalues[state(0, 3, 1, 4), 0] == -20
+
+    optimal = np.array([
+        solution.best_actions(state_n)[0] if playable else 0
+        for state_n, playable in enumerate(solution.is_playable())
+    ])
+    for symmetry in [0, 1]:
+        agent = Agent(TTT, params={'symmetry': symmetry})
+        assert solution.optimal_rate(agent.predict_batch(
+            np.arange(len(TTT.states))
+        )) < 0.5
+        agent.warm_start(qvalues)
+        actions = agent.predict_batch(np.arange(len(TTT.states)))
+        assert solution.optimal_rate(actions) == 1
+    assert solution.optimal_rate(optimal) == 1
+
+
+def test_OptimalPlayer():
+    players = {0: OptimalPlayer(TTT, 0), 1: OptimalPlayer(TTT, 1)}
+    env = Environment(TTT)
+    for game_n in range(10):
+        env.reset()
+        assert play_game(env, players) == {0: 3, 1: 3}
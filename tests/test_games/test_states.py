@@ -0,0 +1,40 @@
+import pytest
+
+import games.states
+from games.states import LazyStates
+
+
+def test_LazyStates(tmp_path, monkeypatch):
+    monkeypatch.setattr(games.states, "CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def build():
+        calls.append(None)
+        return [(0, 0), (0, 1), (1, -1)]
+
+    class Dummy(object):
+        states = LazyStates(build, "Dummy", version=2)
+
+    assert calls == []
+    states = Dummy.states
+    assert calls == [None]
+    assert Dummy().states is states
+    assert (tmp_path / "Dummy-v2.npy").exists()
+
+    assert len(states) == 3
+    assert states[1] == (0, 1)
+    assert states[-1] == (1, -1)
+    assert list(states) == [(0, 0), (0, 1), (1, -1)]
+    assert states.index((1, -1)) == 2
+    assert (0, 1) in states
+    assert (1, 1) not in states
+    with pytest.raises(ValueError):
+        states.index((1, 1))
+
+    # Other process loads cache
+    class Other(object):
+        states = LazyStates(build, "Dummy", version=2)
+
+    assert list(Other.states) == list(states)
+    assert calls == [None]
+    assert not Other.states.array.flags.writeable
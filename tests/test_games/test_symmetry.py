@@ -0,0 +1,38 @@
+from games.symmetry import dihedral_permutations, get_symmetry
+from games.tictactoe import TTT
+
+
+def test_dihedral_permutations():
+    permutations = dihedral_permutations(3)
+    assert len(permutations) == 8
+    assert permutations[0] == list(range(9))
+    assert [0, 3, 6, 1, 4, 7, 2, 5, 8] in permutations  # Transposition
+    assert len({tuple(permutation) for permutation in permutations}) == 8
+
+
+def test_Symmetry():
+    symmetry = get_symmetry(TTT)
+    assert symmetry is get_symmetry(TTT)
+    assert symmetry.size < len(TTT.states) // 7
+
+    # Corners are the same
+    corners = []
+    for cell_n in [0, 2, 6, 8]:
+        game = TTT()
+        game.act(cell_n, 0)
+        corners.append(game.state())
+    assert len({symmetry.rows[state] for state in corners}) == 1
+
+    # Playing mapped actions in canonical states gives canonical states
+    for state_n in range(0, len(TTT.states), 7):
+        state = TTT.states[state_n]
+        transform = symmetry.transforms[state_n]
+        permutation = TTT.symmetries[transform]
+        canonical = tuple(state[cell_n] for cell_n in permutation)
+        assert symmetry.rows[TTT.state_index(canonical)] == (
+            symmetry.rows[state_n]
+        )
+        for action_n in range(9):
+            column = symmetry.action_maps[transform, action_n]
+            assert canonical[column] == state[action_n]
+            assert symmetry.inverse_action_maps[transform, column] == action_n
@@ -1,7 +1,13 @@
 import pytest
+import random
 
+from games.bitboard import BitTTT
 from games.tictactoe import states_filter, TTT
 from games.exceptions import GameOver, InvalidPlay, InvalidPlayer
+from games.game import (
+    GAME_OVER, INVALID_PLAY, INVALID_PLAYER, PLAYED, STATUS_ERRORS, TIE, WON,
+)
+from games.mnk import mnk_game
 
 
 def test_states_filter():
@@ -120,3 +126,100 @@ def test_TTT():
 
     with pytest.raises(ValueError):
         game.state_index((0, 1, -1, 0, 1, -1, 0, 1, -1))
+
+
+def test_TTT_state_index():
+    states = TTT.states
+    for index in [0, 1, 100, len(states) - 1]:
+        assert TTT.state_index(states[index]) == index
+
+    # Built once and shared
+    assert TTT.states is TTT.states
+    assert TTT.states.indexes is TTT.states.indexes
+    assert len(TTT.states.indexes) == len(states)
+
+
+def test_TTT_reset():
+    game = TTT()
+    cells = game.cells
+    for action_n, player_n in [(0, 0), (1, 1), (3, 0), (2, 1), (6, 0)]:
+        game.act(action_n, player_n)
+    assert game.is_over()
+
+    game.reset()
+    assert game.cells is cells
+    assert not game.is_over()
+    assert game.winner is None
+    assert game.player_n == 0
+    assert not game.history
+    assert TTT.states[game.state()] == (-1, -1, -1, -1, -1, -1, -1, -1, -1)
+    game.act(0, 0)
+    assert game.log is TTT().log
+
+
+def test_TTT_incremental():
+    random.seed(0)
+    for game_n in range(100):
+        game = TTT()
+        while not game.is_over():
+            try:
+                game.act(random.randrange(9), game.player_n)
+            except InvalidPlay:
+                continue
+            state = tuple(cell.number for cell in game.cells)
+            assert game.state() == TTT.state_index(state)
+            assert game.state_code == game.code(state)
+            ended, winner = game.ended, game.winner
+            game.check_end()
+            assert (game.ended, game.winner) == (ended, winner)
+
+
+def test_TTT_legal_masks():
+    game = TTT()
+    assert game.legal_mask() == 0b111111111
+    game.act(0, 0)
+    game.act(4, 1)
+    assert game.legal_mask() == 0b111101110
+
+    masks = TTT.legal_masks()
+    assert masks is TTT.legal_masks()
+    assert len(masks) == len(TTT.states)
+    assert masks[game.state()] == game.legal_mask()
+
+
+def test_TTT_step():
+    game = TTT()
+    assert game.step(0, 0) == PLAYED
+    assert game.step(0, 1) == INVALID_PLAY
+    assert game.step(1, 0) == INVALID_PLAYER
+    for action_n, player_n in [(1, 1), (3, 0), (2, 1)]:
+        assert game.step(action_n, player_n) == PLAYED
+    assert game.step(6, 0) == WON
+    assert game.step(4, 1) == GAME_OVER
+    assert game.winner.number == 0
+
+    # Same statuses on all implementations, exceptions of act matching them
+    random.seed(0)
+    seen = set()
+    for game_n in range(200):
+        games = [TTT(), BitTTT(), mnk_game(3, 3, 3)()]
+        act_game = TTT()
+        while True:
+            action_n = random.randrange(9)
+            player_n = random.choice([1, 0, 0, 1, games[0].player_n])
+            statuses = {game.step(action_n, player_n) for game in games}
+            assert len(statuses) == 1
+            status = statuses.pop()
+            seen.add(status)
+            # act raises the exception of invalid statuses
+            try:
+                act_game.act(action_n, player_n)
+            except (GameOver, InvalidPlay, InvalidPlayer) as exc:
+                assert exc.__class__ is STATUS_ERRORS[status]
+            else:
+                assert status not in STATUS_ERRORS
+            assert len({game.string() for game in games + [act_game]}) == 1
+            if status == GAME_OVER:
+                break
+            assert (status in [WON, TIE]) == games[0].is_over()
+    assert seen == {PLAYED, WON, TIE, INVALID_PLAY, INVALID_PLAYER, GAME_OVER}
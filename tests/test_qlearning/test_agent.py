@@ -0,0 +1,379 @@
+import numpy as np
+import os
+import pytest
+import random
+
+from games.symmetry import get_symmetry
+from games.tictactoe import TTT
+from qlearning import checkpoint
+from qlearning.agent import Agent
+from qlearning.checkpoint import (
+    Checkpointer, load_delta, load_qvalues, save_delta,
+)
+from qlearning.experience import Experience
+from qlearning.trajectory import Trajectory
+
+
+RESULT_DIR = os.path.join(
+    os.path.dirname(__file__), os.pardir, os.pardir, "results", "1M"
+)
+
+
+def test_Agent_qvalues():
+    agent = Agent(TTT)
+    assert agent.qvalues.shape == (len(TTT.states), len(TTT.actions))
+    assert agent.qvalues.dtype == np.float64
+    assert Agent(TTT, dtype=np.float32).qvalues.dtype == np.float32
+
+    # Legacy format
+    qvalues = [[0.] * 9 for state in TTT.states]
+    qvalues[3][4] = 2.
+    qvalues[3][7] = 2.
+    qvalues[5][1] = 1.
+    agent.set_qvalues(qvalues)
+    assert isinstance(agent.qvalues, np.ndarray)
+    assert agent.predict(3) == 4
+    assert agent.predict(5) == 1
+    assert list(agent.predict_batch([3, 5, 0])) == [4, 1, 0]
+
+    with pytest.raises(AssertionError):
+        agent.set_qvalues(qvalues[:-1])
+
+
+def test_Agent_update_qvalue():
+    agent = Agent(TTT, params={'learning_rate': 0.5, 'discount_rate': 0.9})
+    agent.qvalues[2] = [0, 4, 1, 0, 0, 0, 0, 0, 0]
+    update = agent.update_qvalue(Experience(1, 3, 10, 2))
+    assert update == pytest.approx(0.5 * (10 + 0.9 * 4))
+    assert agent.qvalues[1, 3] == pytest.approx(0.5 * (10 + 0.9 * 4))
+    assert agent.qvalues.sum() == pytest.approx(5 + 6.8)
+
+
+@pytest.mark.parametrize("symmetry", [0, 1])
+def test_Agent_update_batch(symmetry):
+    np.random.seed(0)
+    params = {'learning_rate': 0.3, 'symmetry': symmetry}
+    agent = Agent(TTT, params=params)
+    agent.qvalues[:] = np.random.rand(*agent.qvalues.shape)
+    expected = Agent(TTT, params=params)
+    expected.set_qvalues(agent.qvalues.copy())
+
+    # Batches of one experience are sequential updates
+    for exp_n in range(100):
+        state, next_state = np.random.randint(len(TTT.states), size=2)
+        action = np.random.randint(9)
+        reward = np.random.randint(-10, 10)
+        done = exp_n % 3 == 0
+        update = agent.update_batch(
+            [state], [action], [reward], [next_state], [done]
+        )
+        assert update[0] == expected.update_qvalue(
+            Experience(state, action, reward, next_state, done)
+        )
+    assert np.array_equal(agent.qvalues, expected.qvalues)
+    assert np.array_equal(agent.dirty, expected.dirty)
+
+    # Updates of a same state and action add up
+    agent = Agent(TTT, params={'learning_rate': 0.5})
+    updates = agent.update_batch(
+        [1, 1, 2], [3, 3, 3], [10, 4, 2], [0, 0, 0], [True, True, True]
+    )
+    assert list(updates) == [5, 2, 1]
+    assert agent.qvalues[1, 3] == 7
+    assert agent.qvalues[2, 3] == 1
+    assert list(np.flatnonzero(agent.dirty)) == [1, 2]
+
+
+def test_Agent_save_load(tmp_path):
+    agent = Agent(TTT)
+    agent.qvalues[:] = np.random.rand(*agent.qvalues.shape)
+    agent.set_params(exploration_rate=0.5)
+    agent.save(str(tmp_path))
+
+    loaded = Agent(TTT)
+    loaded.load(str(tmp_path))
+    assert np.array_equal(loaded.qvalues, agent.qvalues)
+    assert loaded.params['exploration_rate'] == 0.5
+
+    # Legacy pickled list of lists
+    loaded.load(os.path.join(RESULT_DIR, "0"))
+    assert isinstance(loaded.qvalues, np.ndarray)
+    assert loaded.qvalues.shape == agent.qvalues.shape
+
+
+def test_Agent_replay():
+    np.random.seed(0)
+    agent = Agent(TTT, params={'learning_rate': 1, 'replay_batch': 4})
+    agent.update_qvalue(Experience(1, 3, 10, 2, done=True))
+    agent.qvalues[1, 3] = 0
+    agent.update_params()
+    assert agent.qvalues[1, 3] == 10
+    assert agent.extras['cumul_reward'] == 10
+    assert len(agent.history) == 1
+
+    agent.set_params(memory_size=5)
+    assert agent.history.max_size == 5
+
+
+def test_Agent_prioritized_replay():
+    agent = Agent(TTT, params={'priority_alpha': 0.5, 'memory_size': 20})
+    assert agent.history.alpha == 0.5
+    agent.update_qvalue(Experience(1, 3, 10, 2))
+    agent.update_qvalue(Experience(2, 3, 0, 2))
+    assert agent.history.tree.get(0) > agent.history.tree.get(1)
+
+    agent.set_params(priority_alpha=0)
+    assert not hasattr(agent.history, 'alpha')
+
+
+def test_Agent_load_mmap(tmp_path):
+    agent = Agent(TTT, dtype=np.float32)
+    agent.qvalues[4, 2] = 3
+    agent.save(str(tmp_path))
+    assert (tmp_path / "qvalues.bin").exists()
+    assert not (tmp_path / "qvalues.pkl").exists()
+
+    header, qvalues = load_qvalues(str(tmp_path / "qvalues.bin"))
+    assert header == {
+        'game': "TTT",
+        'states': len(TTT.states),
+        'actions': 9,
+        'dtype': "<f4",
+        'delta_n': 0,
+    }
+    assert isinstance(qvalues, np.memmap)
+
+    loaded = Agent(TTT, dtype=np.float32)
+    loaded.load(str(tmp_path))
+    assert loaded.predict(4) == 2
+
+    # Copy on write
+    loaded.qvalues[4, 2] = -1
+    loaded.load(str(tmp_path))
+    assert loaded.qvalues[4, 2] == 3
+
+
+def test_Agent_checkpoints(tmp_path):
+    directory = str(tmp_path)
+    agent = Agent(TTT)
+    checkpointer = Checkpointer(agent, directory)
+    agent.qvalues[7, 1] = 1
+    checkpointer.checkpoint()  # Whole agent
+    checkpointer.wait()
+    assert not agent.dirty.any()
+
+    agent.update_qvalue(Experience(3, 4, 100, 5))
+    agent.update_qvalue(Experience(8, 0, 100, 5))
+    agent.set_extras(updates_n=2)
+    checkpointer.checkpoint()
+    agent.update_qvalue(Experience(8, 2, 100, 5))
+    checkpointer.checkpoint()
+    checkpointer.close()
+    assert sorted(os.listdir(directory)) == [
+        "delta-000001.npz", "delta-000002.npz",
+        "extras.json", "params.json", "qvalues.bin",
+    ]
+    rows, values, params, extras = load_delta(
+        os.path.join(directory, "delta-000001.npz")
+    )
+    assert list(rows) == [3, 8]
+    assert extras['updates_n'] == 2
+
+    # Resume
+    loaded = Agent(TTT)
+    loaded.load(directory)
+    assert np.array_equal(loaded.qvalues, agent.qvalues)
+    assert loaded.extras['updates_n'] == 2
+
+    # Saving replaces deltas
+    loaded.save(directory)
+    assert "delta-000001.npz" not in os.listdir(directory)
+    loaded.load(directory)
+    assert np.array_equal(loaded.qvalues, agent.qvalues)
+
+    # Stale deltas are ignored
+    save_delta(
+        os.path.join(directory, "delta-000002.npz"),
+        np.array([7]), np.zeros((1, 9)), {}, {},
+    )
+    loaded.load(directory)
+    assert loaded.qvalues[7, 1] == 1
+
+
+def test_Agent_checkpoint_error(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    agent = Agent(TTT)
+    checkpointer = Checkpointer(agent, directory)
+    checkpointer.checkpoint()
+    checkpointer.wait()
+
+    def fail(*args):
+        raise OSError("Disk is full")
+
+    agent.qvalues[3, 4] = 1
+    with monkeypatch.context() as patch:
+        patch.setattr(checkpoint, "save_delta", fail)
+        checkpointer.checkpoint()
+        with pytest.raises(OSError):
+            checkpointer.wait()
+    assert checkpointer.thread.is_alive()
+
+    # Row of failed delta is written with next checkpoint
+    agent.qvalues[5, 6] = 2
+    checkpointer.checkpoint()
+    checkpointer.close()
+    loaded = Agent(TTT)
+    loaded.load(directory)
+    assert loaded.qvalues[3, 4] == 1
+    assert loaded.qvalues[5, 6] == 2
+
+
+def test_Agent_action_mask():
+    np.random.seed(0)
+    random.seed(0)
+    game = TTT()
+    game.act(0, 0)
+    game.act(4, 1)
+    state = game.state()
+
+    agent = Agent(TTT, params={'action_mask': 1})
+    agent.qvalues[state] = [5, 0, 0, 0, 5, 0, 0, 0, 1]
+    assert agent.predict(state) == 8
+    assert list(agent.predict_batch([state, 0])) == [8, 0]
+    actions = {agent.pick_action(state) for i in range(100)}
+    assert actions == {1, 2, 3, 5, 6, 7, 8}
+
+    agent.set_params(action_mask=0)
+    assert agent.predict(state) == 0
+
+
+@pytest.mark.parametrize("symmetry", [0, 1])
+def test_Agent_action_mask_target(symmetry):
+    params = {
+        'action_mask': 1, 'symmetry': symmetry,
+        'learning_rate': 1, 'discount_rate': 1,
+    }
+    game = TTT()
+    game.act(0, 0)
+    game.act(4, 1)
+    next_state = game.state()
+    agents = [Agent(TTT, params=params) for agent_n in range(2)]
+    for agent in agents:
+        # All legal next values are negative, illegal ones stay at 0
+        for action_n in range(9):
+            if agent.legal[next_state, action_n]:
+                agent.update_batch(
+                    [next_state], [action_n], [-5 - action_n], [0], [True]
+                )
+        assert agent.values(next_state).max() == 0
+
+    assert agents[0].update_qvalue(Experience(0, 3, 1, next_state)) == -5
+    assert agents[1].update_batch([0], [3], [1], [next_state], [False]) == -5
+
+
+def test_Agent_symmetry():
+    agent = Agent(TTT, params={'symmetry': 1, 'learning_rate': 1})
+    assert agent.qvalues.shape == (get_symmetry(TTT).size, 9)
+
+    # Learning to play center after a corner, for all corners
+    states = []
+    for cell_n in [0, 2, 6, 8]:
+        game = TTT()
+        game.act(cell_n, 0)
+        states.append(game.state())
+    agent.update_qvalue(Experience(states[0], 4, 10, 0))
+    assert list(agent.predict_batch(states)) == [4, 4, 4, 4]
+
+    # Learning to play the opposite corner
+    agent.update_qvalue(Experience(states[0], 8, 20, 0))
+    assert [agent.predict(state) for state in states] == [8, 6, 2, 0]
+
+    with pytest.raises(ValueError):
+        agent.set_params(symmetry=0)
+
+
+def test_Agent_from_directory(tmp_path):
+    agent = Agent(TTT, params={'symmetry': 1, 'exploration_rate': 0.5})
+    agent.qvalues[3, 1] = 2
+    agent.save(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        Agent(TTT).load(str(tmp_path))
+    loaded = Agent.from_directory(TTT, str(tmp_path))
+    assert loaded.symmetry is not None
+    assert loaded.params == agent.params
+    assert np.array_equal(loaded.qvalues, agent.qvalues)
+
+
+def test_Agent_sparse(tmp_path):
+    dense = Agent(TTT, params={'learning_rate': 0.5})
+    agent = Agent(TTT, params={'learning_rate': 0.5, 'sparse': 100})
+    assert len(agent.table) == 0
+    with pytest.raises(ValueError):
+        agent.set_params(sparse=0)
+    with pytest.raises(ValueError):
+        agent.set_params(action_mask=1)
+    with pytest.raises(ValueError, match="Sparse"):
+        Agent(TTT, params={'sparse': 10, 'symmetry': 1})
+
+    # Same learning as dense qvalues, states being keys
+    experiences = [
+        Experience(1000, 3, 10, 2000),
+        Experience(2000, 4, 5, 1000),
+        Experience(1000, 3, 1, 2000, done=True),
+    ]
+    for exp in experiences:
+        assert agent.update_qvalue(exp) == dense.update_qvalue(exp)
+    assert agent.update_batch([1000], [2], [1], [2000], [False]) == (
+        dense.update_batch([1000], [2], [1], [2000], [False])
+    )
+    assert len(agent.table) == 2
+    assert np.array_equal(agent.values(1000), dense.qvalues[1000])
+    assert list(agent.predict_batch([2000, 3000, 1000])) == (
+        list(dense.predict_batch([2000, 3000, 1000]))
+    )
+
+    # Checkpoint then delta of a new state
+    directory = str(tmp_path)
+    checkpointer = Checkpointer(agent, directory)
+    checkpointer.checkpoint()
+    agent.update_qvalue(Experience(4000, 8, 7, 1000))
+    checkpointer.checkpoint()
+    checkpointer.close()
+    assert os.path.exists(os.path.join(directory, "keys.npy"))
+
+    loaded = Agent.from_directory(TTT, directory)
+    assert loaded.table.capacity == 100
+    assert len(loaded.table) == 3
+    for state in [1000, 2000, 4000]:
+        assert np.array_equal(loaded.values(state), agent.values(state))
+    with pytest.raises(ValueError):
+        Agent(TTT).load(directory)
+
+
+@pytest.mark.parametrize("episodic", [0, 1])
+def test_Agent_trajectory(episodic):
+    params = {'learning_rate': 0.5, 'episodic': episodic}
+    agent = Agent(TTT, params=params)
+    agent.qvalues[:] = np.random.RandomState(0).rand(*agent.qvalues.shape)
+    expected = Agent(TTT, params=params)
+    expected.set_qvalues(agent.qvalues.copy())
+
+    # States of a player differ in a game, so learning from all moves at
+    # once gives the same qvalues as learning after each move
+    trajectory = Trajectory()
+    moves = [(0, 4, 0), (10, 2, 1), (20, 7, 3)]
+    for move_n, (state, action, reward) in enumerate(moves):
+        if move_n:
+            agent.update_step(trajectory, 1, state)
+        trajectory.record(1, state, action, reward)
+    agent.update_trajectory(trajectory, 1, 30)
+
+    for move_n, (state, action, reward) in enumerate(moves):
+        next_state = moves[move_n + 1][0] if move_n < 2 else 30
+        expected.update_qvalue(
+            Experience(state, action, reward, next_state, done=move_n == 2)
+        )
+    assert np.allclose(agent.qvalues, expected.qvalues)
+    assert agent.game_reward == expected.game_reward == 4
+    assert [exp.next_state for exp in agent.history] == [10, 20, 30]
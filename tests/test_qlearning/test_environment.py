@@ -1,5 +1,10 @@
+import numpy as np
+
+from games.game import (
+    GAME_OVER, INVALID_PLAY, INVALID_PLAYER, PLAYED, TIE, WON,
+)
 from games.tictactoe import TTT
-from qlearning.environment import Environment
+from qlearning.environment import Environment, VecEnvironment
 
 
 def test_Environment():
@@ -90,3 +95,51 @@ def test_Environment():
         0: tie,
         1: tie,
     }
+
+
+def test_Environment_step():
+    rewards = {'tie': 5, 'win': 8, 'lose': -10, 'invalid': -50, 'neutral': 2}
+    env = Environment(TTT, rewards=rewards)
+
+    assert env.step(0, 0) == (PLAYED, (2, 0))
+    assert env.step(0, 1) == (INVALID_PLAY, (0, -50))
+    assert env.step(1, 0) == (INVALID_PLAYER, (0, 0))
+    assert env.step(1, 1) == (PLAYED, (0, 2))
+    env.step(3, 0)
+    env.step(2, 1)
+    assert env.step(6, 0) == (WON, (8, -10))
+    assert env.step(4, 1) == (GAME_OVER, (0, 0))
+
+    env.reset()
+    for action_n, player_n in [
+        (0, 0), (1, 1), (2, 0), (4, 1), (3, 0), (6, 1), (5, 0), (8, 1),
+    ]:
+        assert env.step(action_n, player_n)[0] == PLAYED
+    assert env.step(7, 0) == (TIE, (5, 5))
+
+
+def test_VecEnvironment():
+    n = 50
+    envs = [Environment(TTT) for game_n in range(n)]
+    vec_env = VecEnvironment(TTT, n)
+    assert list(vec_env.state()) == [env.state() for env in envs]
+
+    random_state = np.random.RandomState(0)
+    for step in range(300):
+        actions = random_state.randint(9, size=n)
+        players = random_state.randint(2, size=n)
+        rewards = vec_env.act(actions, players)
+        for game_n, env in enumerate(envs):
+            expected = env.act(actions[game_n], players[game_n])
+            assert list(rewards[game_n]) == [expected[0], expected[1]]
+            assert vec_env.next_states[game_n] == env.state()
+            assert vec_env.dones[game_n] == env.game.is_over()
+            if env.game.is_over():
+                env.reset()
+        assert list(vec_env.state()) == [env.state() for env in envs]
+
+    # Default players
+    vec_env.reset()
+    rewards = vec_env.act(np.zeros(n, dtype=int))
+    assert (rewards[:, 0] == Environment.rewards['neutral']).all()
+    assert (vec_env.player_n == 1).all()
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from qlearning.experience import Experience
+from qlearning.history import History, PrioritizedHistory
+from qlearning.sumtree import SumTree
+
+
+def test_History():
+    history = History(3)
+    assert len(history) == 0
+    assert history.total_reward() == 0
+    with pytest.raises(IndexError):
+        history.last()
+
+    for state in range(5):
+        history.append(Experience(state, 1, state * 10, state + 1))
+
+    # Keep last experiences
+    assert len(history) == 3
+    assert [exp.state for exp in history] == [2, 3, 4]
+    assert history.last().next_state == 5
+    assert history.total_reward() == 90
+
+    states, actions, rewards, next_states, dones = history.sample(
+        100, random_state=np.random.RandomState(0)
+    )
+    assert set(states) == {2, 3, 4}
+    assert (rewards == states * 10).all()
+    assert (next_states == states + 1).all()
+    assert not dones.any()
+
+    history.append(Experience(9, 0, 1, 9, done=True))
+    assert history.last().done
+    assert [exp.state for exp in history] == [3, 4, 9]
+
+    history.clean()
+    assert len(history) == 0
+    assert list(history) == []
+
+    # Columns, keeping last ones
+    history.add(1, 0, 0, 2)
+    indexes = history.extend(
+        [2, 3, 4, 5], [0] * 4, [1.] * 4, [3, 4, 5, 6], [0, 0, 0, 1]
+    )
+    assert list(indexes) == [1, 2, 0]
+    assert [exp.state for exp in history] == [3, 4, 5]
+    assert history.last().done
+
+
+def test_SumTree():
+    tree = SumTree(5)
+    for index, priority in enumerate([1, 0, 3, 2, 4]):
+        tree.update(index, priority)
+    assert tree.total() == 10
+    assert tree.get(2) == 3
+
+    counts = np.bincount(
+        tree.sample(10000, random_state=np.random.RandomState(0)),
+        minlength=5,
+    )
+    assert counts[1] == 0
+    assert list(np.round(counts / 1000)) == [1, 0, 3, 2, 4]
+
+    tree.update(4, 0)
+    assert tree.total() == 6
+    found = [tree.find(value) for value in np.linspace(0, 5.99, 50)]
+    assert set(found) == {0, 2, 3}
+
+
+def test_PrioritizedHistory():
+    history = PrioritizedHistory(4, alpha=1, epsilon=0)
+    for state in range(4):
+        index = history.append(Experience(state, 0, 0, 0))
+        assert index == state
+    history.update_priorities([0, 1, 2, 3], [0, 0, -5, 0])
+    states = history.sample(50, random_state=np.random.RandomState(0))[0]
+    assert set(states) == {2}
+
+    # New experiences get max priority
+    history.append(Experience(7, 0, 0, 0))
+    assert history.tree.get(0) == 5
+    history.extend([8, 9], [0, 0], [0, 0], [0, 0], [0, 0])
+    assert history.tree.get(1) == history.tree.get(2) == 5
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from qlearning.qtable import SparseQValues
+
+
+def test_SparseQValues():
+    table = SparseQValues(100, 3)
+    assert table.values.shape == (101, 3)
+    assert len(table) == 0
+
+    keys = [5, 2 ** 40, 0, 123456789]
+    assert [table.row(key) for key in keys] == [0, 1, 2, 3]
+    assert [table.row(key) for key in keys] == [0, 1, 2, 3]
+    assert table.row(7, insert=False) == -1
+    assert len(table) == 4
+    assert list(table.keys[:4]) == keys
+
+    # Batches, with missing and repeated keys
+    rows = table.rows([0, 7, 5, 7, 8, 2 ** 40], insert=False)
+    assert list(rows) == [2, -1, 0, -1, -1, 1]
+    rows = table.rows([0, 7, 5, 7, 8, 2 ** 40])
+    assert list(rows) == [2, 4, 0, 4, 5, 1]
+
+    # Many keys, probing collisions
+    keys = np.arange(90) * 2 ** 30  # Same low bits
+    table.clear()
+    assert list(table.rows(keys)) == list(range(90))
+    assert [table.row(key) for key in keys] == list(range(90))
+    with pytest.raises(ValueError):
+        table.rows(np.arange(11) + 10 ** 13)
+    assert not table.values[-1].any()
@@ -0,0 +1,55 @@
+import multiprocessing
+import numpy as np
+
+from games.tictactoe import TTT
+from qlearning.agent import Agent
+from qlearning.experience import Experience
+from qlearning.shared import SharedQValues
+
+
+def learn(shared, state):
+    agent = Agent(TTT, params={'learning_rate': 1})
+    agent.attach_qvalues(shared)
+    for i in range(10):
+        agent.update_qvalue(Experience(state, 2, 1, 0))
+
+
+def test_SharedQValues():
+    qvalues = np.arange(12, dtype=np.float32).reshape(4, 3)
+    shared = SharedQValues.create(qvalues, lock_n=2)
+    assert shared.array.dtype == np.float32
+    assert np.array_equal(shared.array, qvalues)
+
+    attached = SharedQValues(shared.shape, shared.dtype, name=shared.name)
+    attached.array[1, 2] = -1
+    assert shared.array[1, 2] == -1
+    assert attached.lock(3) is None
+    assert shared.lock(3) is shared.lock(1)
+
+    snapshot = shared.snapshot()
+    shared.array[1, 2] = 5
+    assert snapshot[1, 2] == -1
+
+    attached.close()
+    shared.close()
+
+
+def test_Agent_shared_qvalues():
+    agent = Agent(TTT)
+    shared = agent.share_qvalues(lock_n=4)
+    assert agent.qvalues is shared.array
+
+    processes = [
+        multiprocessing.Process(target=learn, args=(shared, state))
+        for state in [1, 2, 3]
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert list(agent.snapshot_qvalues()[1:4, 2]) == [1, 1, 1]
+
+    agent.unshare_qvalues()
+    assert agent.shared is None
+    assert list(agent.qvalues[1:4, 2]) == [1, 1, 1]
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from qlearning.trajectory import Trajectory
+
+
+def test_Trajectory():
+    trajectory = Trajectory(max_length=2)
+    with pytest.raises(IndexError):
+        trajectory.last(0)
+    trajectory.reward(0, 5)  # No move yet
+
+    for move_n in range(3):
+        trajectory.record(0, 10 + move_n, move_n, 1)
+        trajectory.reward(1, -1)
+        trajectory.record(1, 20 + move_n, move_n, 0)
+        trajectory.reward(0, 2)
+    assert trajectory.lengths == [3, 3]
+    assert trajectory.last(0) == (12, 2, 3)
+    assert trajectory.last(1) == (22, 2, 0)
+
+    states, actions, rewards, next_states, dones = trajectory.columns(1, 99)
+    assert list(states) == [20, 21, 22]
+    assert list(actions) == [0, 1, 2]
+    assert list(rewards) == [-1, -1, 0]
+    assert list(next_states) == [21, 22, 99]
+    assert list(dones) == [False, False, True]
+
+    trajectory.clear()
+    assert trajectory.lengths == [0, 0]
+    assert len(trajectory.columns(0, 99)[0]) == 0
+    assert trajectory.columns(0, 99)[3].dtype == np.int64
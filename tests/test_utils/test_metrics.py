@@ -0,0 +1,50 @@
+import numpy as np
+import os
+import tempfile
+
+from report import group_fields
+from utils.metrics import Aggregate, MetricsWriter, read_metrics
+
+
+def test_Aggregate():
+    aggregate = Aggregate(smoothing=0.5)
+    for value in [4, 2, 6]:
+        aggregate.add(value)
+    assert aggregate.count == 3
+    assert aggregate.mean == 4
+    assert aggregate.moving == 4.5
+    assert aggregate.min == 2
+    assert aggregate.max == 6
+
+
+def test_MetricsWriter():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "run", "metrics.csv")
+        with MetricsWriter(path, ["game", "reward"], buffer_size=3) as writer:
+            for game_n in range(4):
+                writer.append(game_n, 2 * game_n)
+            # Full buffers only are written
+            assert len(read_metrics(path)[1]) == 3
+        assert writer.aggregates['reward'].mean == 3
+
+        # Resumed stream
+        with MetricsWriter(path, ["game", "reward"]) as writer:
+            for game_n in range(4, 10):
+                writer.append(game_n, 2 * game_n)
+
+        fields, records = read_metrics(path)
+        assert fields == ["game", "reward"]
+        assert np.array_equal(records[:, 0], np.arange(10))
+        assert np.array_equal(records[:, 1], 2 * np.arange(10))
+
+        fields, records = read_metrics(path, points=3)
+        assert np.array_equal(records[:, 0], [1.5, 5.5, 8.5])
+
+
+def test_group_fields():
+    assert group_fields(
+        ["game", "reward_0", "reward_1", "cumul_reward_0", "cumul_reward_1"]
+    ) == {
+        'reward': ["reward_0", "reward_1"],
+        'cumul_reward': ["cumul_reward_0", "cumul_reward_1"],
+    }
@@ -0,0 +1,49 @@
+import io
+
+from games.tictactoe import TTT
+from main import play_game
+from qlearning.agent import Agent
+from qlearning.environment import Environment
+from utils.profiling import Profiler, Progress
+
+
+def test_profiler():
+    profiler = Profiler()
+    start = profiler.start()
+    assert profiler.stop('phase', start) >= start
+    profiler.stop('phase', start)
+    profiler.count('games')
+    profiler.count('steps', 5)
+    assert profiler.calls['phase'] == 2
+    assert profiler.times['phase'] >= 0
+    assert profiler.counters == {'games': 1, 'steps': 5}
+    assert "5.0 steps/game" in profiler.summary()
+
+
+def test_play_game_profiled():
+    agents = {0: Agent(TTT), 1: Agent(TTT)}
+    for player_n, agent in agents.items():
+        agent.number = player_n
+    env = Environment(TTT)
+    profiler = Profiler()
+    play_game(env, agents, profiler=profiler)
+    assert profiler.counters['games'] == 1
+    valid_n = sum(len(cells) for cells in env.game.history.values())
+    # Steps also include turns skipped after invalid plays
+    assert (
+        profiler.counters['steps']
+        >= valid_n + profiler.counters.get('invalid', 0)
+    )
+    assert (
+        set(profiler.times) == {'encode', 'select', 'step', 'update'}
+    )
+
+
+def test_progress():
+    stream = io.StringIO()
+    progress = Progress(10, interval=60, stream=stream)
+    for done in range(1, 11):
+        progress.update(done)
+    # First and last updates only
+    assert stream.getvalue().count("\r") == 2
+    assert "10 / 10" in stream.getvalue()
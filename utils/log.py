@@ -3,6 +3,9 @@ import logging
 import os
 
 
+LOGGERS = {}
+
+
 def create_logger(name, log_level, log_path=None):
     """Create a logger.
 
@@ -15,7 +18,7 @@ def create_logger(name, log_level, log_path=None):
     """
     log = logging.getLogger(name)
 
-    while log.hasHandlers():
+    while log.handlers:
         log.removeHandler(log.handlers[0])
 
     if log_path:
@@ -32,3 +35,14 @@ def create_logger(name, log_level, log_path=None):
     log.addHandler(log_sh)
 
     return log
+
+
+def get_logger(name, log_level, log_path=None):
+    """Return logger, created by create_logger on first call only.
+
+    Use it for loggers shared by many objects, so that handlers are not
+    recreated for each of them.
+    """
+    if name not in LOGGERS:
+        LOGGERS[name] = create_logger(name, log_level, log_path)
+    return LOGGERS[name]
@@ -0,0 +1,127 @@
+"""Streaming of training metrics to disk."""
+import math
+import numpy as np
+import os
+
+
+class Aggregate(object):
+    """Running aggregates of a metric, in constant memory."""
+
+    def __init__(self, smoothing=0.01):
+        """Create aggregates of a metric.
+
+        Args:
+            smoothing (float): weight of a new value in the moving average
+        """
+        self.smoothing = smoothing
+        self.count = 0
+        self.mean = 0.
+        self.moving = 0.  # Exponential moving average
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        if self.count == 1:
+            self.moving = value
+        else:
+            self.moving += self.smoothing * (value - self.moving)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def __str__(self):
+        return "mean %.3f, moving %.3f, min %.3f, max %.3f" % (
+            self.mean, self.moving, self.min, self.max
+        )
+
+
+class MetricsWriter(object):
+    """Append records of metrics to a CSV file, in buffered chunks.
+
+    Records are appended to an existing file, so that a resumed training
+    continues its stream. Aggregates of metrics only cover appended records.
+    """
+
+    def __init__(self, path, fields, buffer_size=1000):
+        """Create a writer of metrics.
+
+        Args:
+            path (str): path of CSV file
+            fields (list of str): names of metrics of a record
+            buffer_size (int): number of records written at once
+        """
+        self.path = path
+        self.fields = list(fields)
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        new = not os.path.exists(path) or not os.path.getsize(path)
+        self.file = open(path, "a")
+        if new:
+            self.file.write(",".join(self.fields) + "\n")
+        self.buffer = np.empty((buffer_size, len(self.fields)))
+        self.size = 0
+        self.aggregates = {field: Aggregate() for field in self.fields}
+
+    def append(self, *values):
+        """Append a record, values being in order of fields."""
+        self.buffer[self.size] = values
+        self.size += 1
+        for field, value in zip(self.fields, values):
+            self.aggregates[field].add(value)
+        if self.size == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to file."""
+        if self.size:
+            np.savetxt(
+                self.file, self.buffer[:self.size], fmt="%.10g", delimiter=","
+            )
+            self.size = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_metrics(path, points=None):
+    """Return fields and records of a CSV file of metrics.
+
+    Args:
+        path (str): path of CSV file
+        points (int): if not None, records are downsampled to about this
+            number by averaging consecutive records, reading the file by
+            chunks so that memory does not grow with its size
+
+    Returns:
+        (list of str, numpy.ndarray): names of fields, array of records
+    """
+    with open(path) as file:
+        fields = file.readline().strip().split(",")
+        rows_n = sum(1 for line in file)
+
+    chunk = 1
+    if points:
+        chunk = max(-(-rows_n // points), 1)
+    if chunk == 1:
+        records = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        return fields, records.reshape(rows_n, len(fields))
+
+    records = np.empty((-(-rows_n // chunk), len(fields)))
+    with open(path) as file:
+        file.readline()
+        for record_n in range(len(records)):
+            rows = np.loadtxt(
+                file, delimiter=",", max_rows=chunk, ndmin=2
+            )
+            records[record_n] = rows.mean(axis=0)
+    return fields, records
@@ -0,0 +1,100 @@
+"""Low-overhead instrumentation of training loops."""
+import sys
+import time
+from collections import defaultdict
+
+
+class Profiler(object):
+    """Nanosecond phase timers and counters.
+
+    Time a phase with:
+        start = profiler.start()
+        ...
+        profiler.stop("phase", start)
+    Code being instrumented should only call the profiler when one is given,
+    so that there is no overhead without it.
+    """
+
+    def __init__(self):
+        self.times = defaultdict(int)  # Nanoseconds by phase
+        self.calls = defaultdict(int)  # Number of calls by phase
+        self.counters = defaultdict(int)
+        self.created = time.perf_counter_ns()
+
+    def start(self):
+        """Return start time of a phase."""
+        return time.perf_counter_ns()
+
+    def stop(self, phase, start):
+        """Add time since start to phase, return current time."""
+        now = time.perf_counter_ns()
+        self.times[phase] += now - start
+        self.calls[phase] += 1
+        return now
+
+    def count(self, name, number=1):
+        """Increment counter."""
+        self.counters[name] += number
+
+    def elapsed(self):
+        """Return seconds since creation."""
+        return (time.perf_counter_ns() - self.created) / 1e9
+
+    def summary(self):
+        """Return summary of phases and counters as a string."""
+        elapsed = self.elapsed()
+        lines = ["Profile of %.1fs:" % elapsed]
+        total = sum(self.times.values()) or 1
+        for phase, ns in sorted(
+            self.times.items(), key=lambda item: -item[1]
+        ):
+            lines.append(
+                "    %-12s %8.3fs %5.1f%% %10d calls %8.0fns/call" % (
+                    phase, ns / 1e9, 100 * ns / total,
+                    self.calls[phase], ns / self.calls[phase],
+                )
+            )
+        for name, value in sorted(self.counters.items()):
+            lines.append("    %-12s %10d" % (name, value))
+        games = self.counters.get('games')
+        if games:
+            lines.append(
+                "    %.1f steps/game, %.1f games/s" % (
+                    self.counters.get('steps', 0) / games, games / elapsed
+                )
+            )
+        return "\n".join(lines)
+
+
+class Progress(object):
+    """Rate-limited progress display."""
+
+    def __init__(self, total, interval=0.5, stream=sys.stdout):
+        """Create a progress display.
+
+        Args:
+            total (int): number of steps
+            interval (float): minimum seconds between two displays
+            stream (file): where to display progress
+        """
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.started = time.monotonic()
+        self.displayed = None
+
+    def update(self, done):
+        """Display progress if last display is old enough or done."""
+        now = time.monotonic()
+        if (
+            self.displayed is not None
+            and now - self.displayed < self.interval
+            and done < self.total
+        ):
+            return
+        self.displayed = now
+        rate = done / max(now - self.started, 1e-9)
+        self.stream.write(
+            "\r%s / %s (%.0f/s)" % (done, self.total, rate)
+        )
+        self.stream.flush()